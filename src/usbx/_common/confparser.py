@@ -4,7 +4,6 @@
 # https://opensource.org/licenses/MIT
 
 from struct import Struct
-from typing import Optional
 
 from ..configuration import Configuration, AlternateInterface, Interface, CompositeFunction, Endpoint
 from ..exceptions import USBError
@@ -30,7 +29,30 @@ class USBConfigurationParser(object):
         self.parse()
 
     def parse(self) -> None:
-        last_alternate: Optional[AlternateInterface] = None
+        descriptors = self.list_descriptors()
+        num_descriptors = len(descriptors)
+
+        for index, (offset, desc_type) in enumerate(descriptors):
+            if desc_type == interface_descriptor_type:
+                # the endpoints of the interface follow up to the next interface descriptor
+                end = index + 1
+                while end < num_descriptors and descriptors[end][1] != interface_descriptor_type:
+                    end += 1
+                endpoints = [self.parse_endpoint(ep_offset) for ep_offset, ep_type in descriptors[index + 1:end]
+                             if ep_type == endpoint_descriptor_type]
+                intf = self.parse_interface(offset, endpoints)
+                self.add_interface(intf)
+
+            elif desc_type == interface_association_descriptor_type:
+                self.parse_iad(offset)
+
+    def list_descriptors(self) -> list[tuple[int, int]]:
+        """
+        Lists the descriptors following the configuration descriptor header.
+
+        :return: list of descriptor offsets and types
+        """
+        descriptors = []
         offset = self.peek_desc_length(0)
 
         while offset < len(self.buffer):
@@ -40,20 +62,11 @@ class USBConfigurationParser(object):
             if offset + desc_length > len(self.buffer):
                 raise USBError(f"Invalid USB configuration descriptor at pos {offset}")
 
-            if desc_type == interface_descriptor_type:
-                intf = self.parse_interface(offset)
-                last_alternate = self.add_interface(intf)
-
-            elif desc_type == endpoint_descriptor_type:
-                endpoint = self.parse_endpoint(offset)
-                if last_alternate is not None:
-                    last_alternate.endpoints.append(endpoint)
-
-            elif desc_type == interface_association_descriptor_type:
-                self.parse_iad(offset)
-
+            descriptors.append((offset, desc_type))
             offset += desc_length
 
+        return descriptors
+
     #  struct USBConfigurationDescriptor {
     #      uint8_t  bLength;
     #      uint8_t  bDescriptorType;
@@ -117,12 +130,13 @@ class USBConfigurationParser(object):
     #      uint8_t iInterface;
     #  } __attribute__((packed));
 
-    def parse_interface(self, offset: int) -> Interface:
+    def parse_interface(self, offset: int, endpoints: list[Endpoint]) -> Interface:
         alternate = AlternateInterface(
             self.buffer[offset + 3],
             self.buffer[offset + 5],
             self.buffer[offset + 6],
             self.buffer[offset + 7],
+            endpoints
         )
         number = self.buffer[offset + 2]
         return Interface(number, [alternate])
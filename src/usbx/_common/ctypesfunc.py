@@ -3,32 +3,58 @@
 # Licensed under MIT License
 # https://opensource.org/licenses/MIT
 
-from ctypes import POINTER, cast, c_uint8, c_void_p
+import functools
+from ctypes import POINTER, cast, c_char_p, c_uint8, c_void_p
 
 from typing import Any
 
 
+@functools.lru_cache(maxsize=64)
+def _byte_array_type(length: int) -> Any:
+    # array types for the typical transfer sizes are only created once
+    return c_uint8 * length
+
+
+@functools.lru_cache(maxsize=64)
+def _byte_array_pointer_type(length: int) -> Any:
+    return POINTER(_byte_array_type(length))
+
+
 def readable_buffer(data: bytes, target_type: Any = c_void_p) -> POINTER:
     """
     Creates a *ctypes* instance for the given data.
 
-    The returned instance is of the specified *ctypes* type.
+    ``bytes`` objects are used without copying them. Other types are copied.
+    The returned instance is of the specified *ctypes* type. If the type is ``None``,
+    the ``c_uint8`` array is returned without a cast. It can be passed directly
+    to parameters declared as ``POINTER(c_uint8)``.
 
     :param data: data to convert to a *ctypes* buffer
     :param target_type: type of resulting pointer (defaults to ``c_void_p``).
     :return: *ctypes* pointer
     """
-    return cast((c_uint8 * len(data)).from_buffer_copy(data), target_type)
+    if type(data) is bytes:
+        # bytes are immutable, so the result can point to their memory instead of a copy;
+        # the cast from c_char_p (or the array's base pointer) keeps a reference to the data
+        if target_type is not None:
+            return cast(c_char_p(data), target_type)
+        return cast(c_char_p(data), _byte_array_pointer_type(len(data))).contents
+
+    array = _byte_array_type(len(data)).from_buffer_copy(data)
+    return cast(array, target_type) if target_type is not None else array
 
 
 def writable_buffer(data: bytearray, target_type: Any = c_void_p) -> POINTER:
     """
     Creates a writable *ctypes* instance sharing the buffer with the given data..
 
-    The returned instance is of the specified *ctypes* type.
+    The returned instance is of the specified *ctypes* type. If the type is ``None``,
+    the ``c_uint8`` array is returned without a cast. It can be passed directly
+    to parameters declared as ``POINTER(c_uint8)``.
 
     :param data: data convert to a *ctypes* instance
     :param target_type: type of resulting pointer (defaults to ``c_void_p``).
     :return: *ctypes* pointer
     """
-    return cast((c_uint8 * len(data)).from_buffer(data), target_type)
+    array = _byte_array_type(len(data)).from_buffer(data)
+    return cast(array, target_type) if target_type is not None else array
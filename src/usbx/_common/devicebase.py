@@ -23,16 +23,15 @@ class DeviceBase(Device):
     def __init__(self, identifier: str):
         super().__init__(identifier)
         self._device_lock = Lock()  # Lock used when manipulating the device
+        # endpoints of the current alternate settings, built on demand
+        self._endpoint_table: Optional[dict[tuple[int, TransferDirection], tuple[Endpoint, Interface]]] = None
 
     def __str__(self) -> str:
         return (f'USD device {self.identifier}, vid=0x{self.vid:04x}, pid=0x{self.pid:04x}, '
                 f'manufacturer={self.manufacturer}, product={self.product}, serial={self.serial}')
 
     def get_interface(self, number: int) -> Optional[Interface]:
-        for intf in self.configuration.interfaces:
-            if intf.number == number:
-                return intf
-        return None
+        return self.configuration.get_interface(number)
 
     def get_endpoint_and_interface(self, number: int, direction: TransferDirection
                                    ) -> Optional[tuple[Endpoint, Interface]]:
@@ -42,11 +41,14 @@ class DeviceBase(Device):
         :param direction: Endpoint direction
         :return: Tuple of endpoint and interface descriptor, or ``None`` if the endpoint does not exist
         """
-        for intf in self.configuration.interfaces:
-            for endpoint in intf.current_alternate.endpoints:
-                if endpoint.number == number and endpoint.direction == direction:
-                    return endpoint, intf
-        return None
+        endpoint_table = self._endpoint_table
+        if endpoint_table is None:
+            endpoint_table = {}
+            for intf in self.configuration.interfaces:
+                for endpoint in intf.current_alternate.endpoints:
+                    endpoint_table.setdefault((endpoint.number, endpoint.direction), (endpoint, intf))
+            self._endpoint_table = endpoint_table
+        return endpoint_table.get((number, direction))
 
     def get_endpoint(self, number: int, direction: TransferDirection) -> Optional[Endpoint]:
         endpoint, _ = self.get_endpoint_and_interface(number, direction) or (None, None)
@@ -94,6 +96,7 @@ class DeviceBase(Device):
         self.configuration_descriptor = config_desc
         self.configuration = USBConfigurationParser.parse_bytes(config_desc)
         self.configuration_value = self.configuration.configuration_value
+        self._endpoint_table = None
 
     def check_is_open(self) -> None:
         if not self.is_open:
@@ -154,6 +157,7 @@ class DeviceBase(Device):
         intf = self.get_interface(interface_number)
         alt = intf.get_alternate(alternate_number)
         intf._current_alternate = alt
+        self._endpoint_table = None
 
     def detach_standard_drivers(self) -> None:
         self.check_is_closed_and_connected()
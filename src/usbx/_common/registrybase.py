@@ -3,8 +3,10 @@
 # Licensed under MIT License
 # https://opensource.org/licenses/MIT
 
+import functools
+import operator
 from threading import Lock, Condition, Thread
-from typing import Optional, Callable
+from typing import Any, Optional, Callable
 
 from ..device import Device
 from ..exceptions import USBError
@@ -15,6 +17,35 @@ def sorted_devices(devices: list[Device]) -> list[Device]:
     return sorted(devices, key=lambda device: device.identifier)
 
 
+@functools.lru_cache(maxsize=16)
+def criteria_getter(names: tuple[str, ...]) -> Callable[[Device], Any]:
+    # the same combination of criteria is typically used repeatedly
+    return operator.attrgetter(*names)
+
+
+def create_matcher(match: Optional[Callable[[Device], bool]], criteria: dict[str, Any]) -> Callable[[Device], bool]:
+    """
+    Creates a function testing if a device matches the criteria and the matching function.
+
+    :param match: Matching function, or ``None``.
+    :param criteria: Property name/value pairs.
+    :return: Function returning ``True`` if a device matches.
+    """
+    # fetch all criteria properties with a single call; for a single criterion,
+    # attrgetter returns the value itself instead of a tuple
+    getter = criteria_getter(tuple(criteria)) if criteria else None
+    values = tuple(criteria.values()) if len(criteria) > 1 else next(iter(criteria.values()), None)
+
+    def matches(device: Device) -> bool:
+        if getter is not None and getter(device) != values:
+            return False
+        if match is not None:
+            return match(device)
+        return True
+
+    return matches
+
+
 class DeviceRegistryBase(DeviceRegistry):
     """
     Base class for all UsbDeviceRegistry implementations.
@@ -30,6 +61,8 @@ class DeviceRegistryBase(DeviceRegistry):
         self.disconnected_callback: Optional[Callable[[Device], None]] = None
 
         self.device_list: Optional[list[Device]] = None
+        # devices by (vid, pid), built on demand and reset whenever the device list changes
+        self.vid_pid_index: Optional[dict[tuple[int, int], list[Device]]] = None
         self.failureReason: Optional[Exception] = None
 
         self.lock: Lock = Lock()
@@ -37,20 +70,17 @@ class DeviceRegistryBase(DeviceRegistry):
         self.monitor_thread: Optional[Thread] = None
 
     def find_devices(self, match: Callable[[Device], bool] = None, **kwargs) -> list[Device]:
-
-        def matches(device: Device) -> bool:
-            for key, val in kwargs.items():
-                if getattr(device, key) != val:
-                    return False
-            if match is not None:
-                return match(device)
-            return True
-
-        return list(filter(matches, self.get_devices()))
+        return list(filter(create_matcher(match, kwargs), self.get_candidates(kwargs)))
 
     def find_device(self, match: Callable[[Device], bool] = None, **kwargs) -> Optional[Device]:
-        devices = self.find_devices(match, **kwargs)
-        return devices[0] if len(devices) >= 1 else None
+        # stop at the first match
+        return next(filter(create_matcher(match, kwargs), self.get_candidates(kwargs)), None)
+
+    def get_candidates(self, criteria: dict[str, Any]) -> list[Device]:
+        devices = self.get_devices()
+        if 'vid' in criteria and 'pid' in criteria:
+            devices = self.get_vid_pid_index().get((criteria['vid'], criteria['pid']), [])
+        return devices
 
     def on_connected(self, callback: Optional[Callable[[Device], None]]) -> None:
         self.connected_callback = callback
@@ -69,6 +99,23 @@ class DeviceRegistryBase(DeviceRegistry):
             self.start_monitor()
         return self.device_list
 
+    def get_vid_pid_index(self) -> dict[tuple[int, int], list[Device]]:
+        """
+        Gets the connected USB devices indexed by vendor and product ID.
+
+        The devices in each list are in the same order as in the device list.
+        :return: dictionary mapping (vid, pid) to the list of matching devices
+        """
+        self.get_devices()
+        with self.lock:
+            index = self.vid_pid_index
+            if index is None:
+                index = {}
+                for device in self.device_list:
+                    index.setdefault((device.vid, device.pid), []).append(device)
+                self.vid_pid_index = index
+            return index
+
     def monitor_devices(self) -> None:
         # to be implemented by subclasses
         pass
@@ -81,6 +128,7 @@ class DeviceRegistryBase(DeviceRegistry):
         """
         self.failureReason = None
         self.device_list = None
+        self.vid_pid_index = None
 
         self.monitor_thread = Thread(target=self.monitor_devices, daemon=True)
         self.monitor_thread.start()
@@ -98,6 +146,7 @@ class DeviceRegistryBase(DeviceRegistry):
         """
         with self.monitor_condition:
             self.device_list = sorted_devices(devices)
+            self.vid_pid_index = None
             self.monitor_condition.notify_all()
 
     def notify_enumeration_failed(self, exception: Exception) -> None:
@@ -121,6 +170,7 @@ class DeviceRegistryBase(DeviceRegistry):
         """
         with self.lock:
             self.device_list = sorted_devices(self.device_list + [device])
+            self.vid_pid_index = None
         on_connected = self.connected_callback
         if on_connected is not None:
             on_connected(device)
@@ -139,6 +189,7 @@ class DeviceRegistryBase(DeviceRegistry):
             device.close()
             device.is_connected = False
             self.device_list.remove(device)
+            self.vid_pid_index = None
 
         on_disconnected = self.disconnected_callback
         if on_disconnected is not None:
@@ -7,7 +7,7 @@ import errno
 import fcntl
 import logging
 import os
-from ctypes import c_uint
+from ctypes import c_uint, c_void_p
 from typing import Optional
 
 from .asynctransfer import async_dispatcher, Transfer
@@ -23,10 +23,11 @@ from .._common.ctypesfunc import writable_buffer, readable_buffer
 from .._common.devicebase import DeviceBase
 
 
-def create_ctrl_transfer(transfer: ControlTransfer, direction: TransferDirection) -> CtrlTransfer:
-    bm_request = ((0x80 if direction == TransferDirection.IN else 0x00) | (transfer.request_type.value << 5) |
-                  transfer.recipient.value)
-    return CtrlTransfer(bm_request, transfer.request, transfer.value, transfer.index)
+def create_ctrl_transfer(transfer: ControlTransfer, direction: TransferDirection, length: int = 0,
+                         data: Optional[c_void_p] = None) -> CtrlTransfer:
+    bm_request = (direction << 7) | transfer.bm_request_type
+    # all fields are passed to the constructor as it is faster than setting them one by one
+    return CtrlTransfer(bm_request, transfer.request, transfer.value, transfer.index, length, 0, data)
 
 
 def convert_to_usb_exception(err: OSError, operation: str) -> USBError:
@@ -138,10 +139,8 @@ class LinuxDevice(DeviceBase):
             self.check_control_transfer(transfer, TransferDirection.IN)
             fd = self.device_fd
 
-        ctrl_transfer = create_ctrl_transfer(transfer, TransferDirection.IN)
-        ctrl_transfer.wLength = length
         buffer = bytearray(length)
-        ctrl_transfer.data = writable_buffer(buffer)
+        ctrl_transfer = create_ctrl_transfer(transfer, TransferDirection.IN, length, writable_buffer(buffer))
         try:
             transferred = fcntl.ioctl(fd, USBDEVFS_CONTROL, ctrl_transfer, True)
         except OSError as exc:
@@ -154,10 +153,10 @@ class LinuxDevice(DeviceBase):
             self.check_control_transfer(transfer, TransferDirection.OUT)
             fd = self.device_fd
 
-        ctrl_transfer = create_ctrl_transfer(transfer, TransferDirection.OUT)
         if data is not None:
-            ctrl_transfer.wLength = len(data)
-            ctrl_transfer.data = readable_buffer(data)
+            ctrl_transfer = create_ctrl_transfer(transfer, TransferDirection.OUT, len(data), readable_buffer(data))
+        else:
+            ctrl_transfer = create_ctrl_transfer(transfer, TransferDirection.OUT)
         try:
             fcntl.ioctl(fd, USBDEVFS_CONTROL, ctrl_transfer)
         except OSError as exc:
@@ -167,24 +166,24 @@ class LinuxDevice(DeviceBase):
         with self._device_lock:
             endpoint, _ = self.get_and_check_endpoint_and_interface(endpoint_number, TransferDirection.IN)
             buffer = bytearray(endpoint.max_packet_size)
-            address = Endpoint.get_address(endpoint_number, TransferDirection.IN)
-            transfer = async_dispatcher.submit_transfer(self.device_fd, address, TransferType.BULK, buffer, len(buffer))
+            transfer = async_dispatcher.submit_transfer(self.device_fd, endpoint.address, TransferType.BULK, buffer,
+                                                        len(buffer))
 
         self.wait_for_transfer(transfer, timeout, endpoint_number, TransferDirection.IN)
         return bytes(buffer[:transfer.result_size])
 
     def transfer_out(self, endpoint_number: int, data: bytes, timeout: Optional[float] = None) -> None:
         with self._device_lock:
-            _, _ = self.get_and_check_endpoint_and_interface(endpoint_number, TransferDirection.OUT)
-            address = Endpoint.get_address(endpoint_number, TransferDirection.OUT)
-            transfer = async_dispatcher.submit_transfer(self.device_fd, address, TransferType.BULK, data, len(data))
+            endpoint, _ = self.get_and_check_endpoint_and_interface(endpoint_number, TransferDirection.OUT)
+            transfer = async_dispatcher.submit_transfer(self.device_fd, endpoint.address, TransferType.BULK, data,
+                                                        len(data))
 
         self.wait_for_transfer(transfer, timeout, endpoint_number, TransferDirection.OUT)
 
     def clear_halt(self, number: int, direction: TransferDirection) -> None:
         with self._device_lock:
-            _, _ = self.get_and_check_endpoint_and_interface(number, direction)
-            address = c_uint(Endpoint.get_address(number, direction))
+            endpoint, _ = self.get_and_check_endpoint_and_interface(number, direction)
+            address = c_uint(endpoint.address)
             fd = self.device_fd
 
         try:
@@ -194,8 +193,8 @@ class LinuxDevice(DeviceBase):
 
     def abort_transfers(self, number: int, direction: TransferDirection) -> None:
         with self._device_lock:
-            _, _ = self.get_and_check_endpoint_and_interface(number, direction)
-            address = Endpoint.get_address(number, direction)
+            endpoint, _ = self.get_and_check_endpoint_and_interface(number, direction)
+            address = endpoint.address
             fd = self.device_fd
 
         async_dispatcher.abort_transfers(fd, address)
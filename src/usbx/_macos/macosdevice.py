@@ -40,8 +40,7 @@ def transfer_type_from_macos(macos_transfer_type: int) -> TransferType:
 def create_device_request(direction: TransferDirection, setup: ControlTransfer,
                           data: Optional[Union[bytes, bytearray]]) -> IOUSBDevRequest:
     request = IOUSBDevRequest()
-    request.bmRequestType = (0x80 if direction == TransferDirection.IN else 0x00) | (
-                setup.request_type << 5) | setup.recipient
+    request.bmRequestType = (direction << 7) | setup.bm_request_type
     request.bRequest = setup.request
     request.wValue = setup.value
     request.wIndex = setup.index
@@ -282,8 +281,7 @@ class MacosDevice(DeviceBase):
     def get_retained_handle(self, endpoint_number: int, direction: TransferDirection, guard: IOKitGuard) -> (IOUSBInterfaceHandle, int, Endpoint):
         with self._device_lock:
             endpoint, interface = self.get_and_check_endpoint_and_interface(endpoint_number, direction)
-            address = Endpoint.get_address(endpoint_number, direction)
-            pipe_index = self.endpoints[address].pipe_index
+            pipe_index = self.endpoints[endpoint.address].pipe_index
             iokit_intf = self.find_intf_handle(interface)
             guard.retain(iokit_intf)
             return iokit_intf, pipe_index, endpoint
@@ -3,31 +3,81 @@
 # Licensed under MIT License
 # https://opensource.org/licenses/MIT
 
-from ctypes import c_void_p, byref, wintypes, cast, wstring_at, get_last_error, sizeof, create_string_buffer, c_char_p
-from typing import Callable, Optional, Union
+import time
+from collections import OrderedDict
+from ctypes import c_void_p, byref, wintypes, cast, wstring_at, get_last_error, sizeof, create_string_buffer, memset, \
+    addressof, Array, string_at
+from threading import Lock
+from typing import Callable, Iterable, Optional, Union
 from winreg import KEY_READ, QueryValueEx, CloseKey
 
 from .kernel32 import ERROR_NO_MORE_ITEMS, ERROR_NOT_FOUND, ERROR_INSUFFICIENT_BUFFER
 from .ole32 import ole32, GUID, PGUID, CLSID
-from .setupapi import setupapi, SP_DEVINFO_DATA, HDEVINFO, DIGCF_PRESENT, DIGCF_DEVICEINTERFACE, DEVPROP_TYPE_STRING, \
-    SP_DEVICE_INTERFACE_DATA, SP_DEVICE_INTERFACE_DETAIL_DATA_W, DEVPROPKEY, DEVPROP_TYPE_UINT32, \
-    DEVPKEY_Device_Service, DICS_FLAG_GLOBAL, DIREG_DEV, DEVPROP_TYPEMOD_LIST
+from .setupapi import SetupDiGetClassDevsW, SetupDiEnumDeviceInfo, SetupDiGetDevicePropertyW, \
+    SetupDiDeleteDeviceInterfaceData, SetupDiDestroyDeviceInfoList, SetupDiEnumDeviceInterfaces, \
+    SetupDiGetDeviceInterfaceDetailW, SetupDiCreateDeviceInfoList, SetupDiOpenDeviceInterfaceW, \
+    SetupDiOpenDeviceInfoW, SetupDiOpenDevRegKey, SP_DEVINFO_DATA, HDEVINFO, DIGCF_PRESENT, DIGCF_DEVICEINTERFACE, \
+    DEVPROP_TYPE_STRING, SP_DEVICE_INTERFACE_DATA, PSP_DEVICE_INTERFACE_DETAIL_DATA_W, DEVPROPKEY, \
+    DEVPROP_TYPE_UINT32, DEVPKEY_Device_Service, DICS_FLAG_GLOBAL, DIREG_DEV, DEVPROP_TYPEMOD_LIST
 from .winerror import raise_error, raise_last_error
 from ..exceptions import USBError
 
+# Short-lived cache of resolved device paths, keyed by interface GUID and instance ID.
+# The set of present devices rarely changes, so repeated lookups within the TTL
+# can skip the expensive Setup API enumeration.
+PATH_CACHE_TTL = 2.0
+_path_cache: dict[tuple[bytes, str], tuple[float, str]] = {}
+_path_cache_lock = Lock()
+
+# Offset of the first member of SP_DEVICE_INTERFACE_DATA after cbSize
+_INTF_DATA_CLEAR_OFFSET = SP_DEVICE_INTERFACE_DATA.ClassGuid.offset
+
+# Size of buffer for SP_DEVICE_INTERFACE_DETAIL_DATA_W, and offset of DevicePath within it
+DETAIL_DATA_BUFFER_SIZE = 1024
+DETAIL_DATA_PATH_OFFSET = 4
+
+# Name of the Windows service for composite USB devices
+_USBCCGP = 'usbccgp'
+
+# Parsed device interface GUIDs, keyed by device instance ID (least recently used are dropped first).
+# Entries are removed when the device is disconnected as the driver might change.
+GUID_CACHE_SIZE = 64
+_guid_cache: OrderedDict[str, list[GUID]] = OrderedDict()
+_guid_cache_lock = Lock()
+
 
 def string_list_from_bytes(strlist: bytes) -> list[str]:
-    string_list: list[str] = []
-    start = 0
-    index = 0
-    while index + 1 < len(strlist):
-        if strlist[index] == 0 and strlist[index + 1] == 0:
-            if index == start:
-                break
-            string_list.append(wstring_at(strlist[start:index + 1]))
-            start = index + 2
-        index += 2
-    return string_list
+    # split the UTF-16 MULTI_SZ list at the NUL characters; the last element is
+    # the (unterminated) remainder and the list ends with an empty string
+    strings = bytes(strlist).decode('utf-16-le', errors='replace').split('\x00')[:-1]
+    if '' in strings:
+        strings = strings[:strings.index('')]
+    return strings
+
+
+def create_detail_data_buffer() -> Array:
+    """
+    Creates a buffer for the variable size ``SP_DEVICE_INTERFACE_DETAIL_DATA_W`` struct.
+
+    The ``cbSize`` member is initialized.
+    """
+    buffer = create_string_buffer(DETAIL_DATA_BUFFER_SIZE)
+    cast(buffer, wintypes.PDWORD)[0] = 8  # expected by Windows for this variable size struct
+    return buffer
+
+
+def guids_from_strings(guid_strings: list[str]) -> list[GUID]:
+    guids: list[GUID] = []
+    for guid_string in dict.fromkeys(guid_strings):  # remove duplicates, keep order
+        try:
+            guids.append(GUID(guid_string))
+        except ValueError:
+            # fall back to the Windows parser for unusual formats
+            clsid = CLSID()
+            if ole32.CLSIDFromString(guid_string, byref(clsid)) != 0:
+                continue
+            guids.append(clsid)
+    return guids
 
 
 class DeviceInfoSet:
@@ -38,15 +88,24 @@ class DeviceInfoSet:
     and a current element within the set.
     """
 
+    __slots__ = ('dev_info_set', 'dev_info_data', '_dev_info_data_ref', 'dev_intf_data', '_reusable_intf_data',
+                 'iteration_index', '_prop_buf_size', '_prop_buf')
+
     def __init__(self, create: Callable[[], Optional[HDEVINFO]]):
         self.dev_info_set: Optional[c_void_p] = create()
         if self.dev_info_set is None:
             raise USBError('internal error (creating device info set)')
 
         self.dev_info_data: SP_DEVINFO_DATA = SP_DEVINFO_DATA()
+        self._dev_info_data_ref = byref(self.dev_info_data)  # created once, passed to all Setup API calls
         self.dev_intf_data: Optional[SP_DEVICE_INTERFACE_DATA] = None
+        self._reusable_intf_data: SP_DEVICE_INTERFACE_DATA = SP_DEVICE_INTERFACE_DATA()
         self.iteration_index: int = -1
 
+        # reusable buffer for variable length properties (large enough for typical properties)
+        self._prop_buf_size: int = 1024
+        self._prop_buf = create_string_buffer(self._prop_buf_size)
+
     def __del__(self):
         self.free_resources()
 
@@ -59,17 +118,17 @@ class DeviceInfoSet:
 
     def free_resources(self):
         if self.dev_intf_data is not None:
-            setupapi.SetupDiDeleteDeviceInterfaceData(self.dev_info_set, self.dev_intf_data)
+            SetupDiDeleteDeviceInterfaceData(self.dev_info_set, self.dev_intf_data)
             self.dev_intf_data = None
         if self.dev_info_set is not None:
-            setupapi.SetupDiDestroyDeviceInfoList(self.dev_info_set)
+            SetupDiDestroyDeviceInfoList(self.dev_info_set)
             self.dev_info_set = None
 
     @classmethod
     def of_present_devices(cls, interface_guid: PGUID, instance_id: Optional[str]) -> 'DeviceInfoSet':
         def create_dev_info_set() -> Optional[HDEVINFO]:
-            info_set = setupapi.SetupDiGetClassDevsW(byref(interface_guid), instance_id, None,
-                                                     DIGCF_PRESENT | DIGCF_DEVICEINTERFACE)
+            info_set = SetupDiGetClassDevsW(byref(interface_guid), instance_id, None,
+                                            DIGCF_PRESENT | DIGCF_DEVICEINTERFACE)
             return info_set if info_set != -1 else None
 
         return DeviceInfoSet(create_dev_info_set)
@@ -97,7 +156,7 @@ class DeviceInfoSet:
     @classmethod
     def of_empty(cls) -> 'DeviceInfoSet':
         def empty_set() -> Optional[HDEVINFO]:
-            info_set = setupapi.SetupDiCreateDeviceInfoList(None, None)
+            info_set = SetupDiCreateDeviceInfoList(None, None)
             return info_set if info_set != -1 else None
 
         return DeviceInfoSet(empty_set)
@@ -111,12 +170,37 @@ class DeviceInfoSet:
         :param interface_guid: The device interface guid.
         :return: The device path.
         """
+        key = (bytes(interface_guid), instance_id)
+        now = time.monotonic()
+        with _path_cache_lock:
+            entry = _path_cache.get(key)
+        if entry is not None and now - entry[0] < PATH_CACHE_TTL:
+            return entry[1]
+
         with DeviceInfoSet.of_present_devices(interface_guid, instance_id) as dev_info_set:
-            return dev_info_set.get_device_path_for_guid(interface_guid)
+            device_path = dev_info_set.get_device_path_for_guid(interface_guid)
+
+        with _path_cache_lock:
+            # drop expired entries so the cache does not grow without bounds
+            for expired_key in [k for k, (ts, _) in _path_cache.items() if now - ts >= PATH_CACHE_TTL]:
+                del _path_cache[expired_key]
+            _path_cache[key] = (now, device_path)
+        return device_path
+
+    @classmethod
+    def remove_cached_interface_guids(cls, instance_ids: Iterable[str]) -> None:
+        """
+        Removes the cached device interface GUIDs of the given devices.
+
+        :param instance_ids: The device instance IDs.
+        """
+        with _guid_cache_lock:
+            for instance_id in instance_ids:
+                _guid_cache.pop(instance_id, None)
 
     def next(self) -> bool:
         self.iteration_index += 1
-        if setupapi.SetupDiEnumDeviceInfo(self.dev_info_set, self.iteration_index, byref(self.dev_info_data)) == 0:
+        if SetupDiEnumDeviceInfo(self.dev_info_set, self.iteration_index, self._dev_info_data_ref) == 0:
             last_error = get_last_error()
             if last_error == ERROR_NO_MORE_ITEMS:
                 return False
@@ -129,32 +213,39 @@ class DeviceInfoSet:
 
         # load device information into dev info set
         intf_data = SP_DEVICE_INTERFACE_DATA()
-        if setupapi.SetupDiOpenDeviceInterfaceW(self.dev_info_set, device_path, 0, intf_data) == 0:
+        if SetupDiOpenDeviceInterfaceW(self.dev_info_set, device_path, 0, intf_data) == 0:
             raise_last_error('internal error (SetupDiOpenDeviceInterfaceW)')
 
         self.dev_intf_data = intf_data
 
-        if setupapi.SetupDiGetDeviceInterfaceDetailW(self.dev_info_set, intf_data, None, 0, None,
-                                                     self.dev_info_data) == 0:
+        # retrieve the device info data; the path is not needed, so an insufficient buffer is fine
+        detail_data = create_detail_data_buffer()
+        if SetupDiGetDeviceInterfaceDetailW(self.dev_info_set, intf_data,
+                                            cast(detail_data, PSP_DEVICE_INTERFACE_DETAIL_DATA_W),
+                                            sizeof(detail_data), None, self._dev_info_data_ref) == 0:
             last_error = get_last_error()
             if last_error != ERROR_INSUFFICIENT_BUFFER:
                 raise_error(last_error, 'internal error (SetupDiGetDeviceInterfaceDetailW)')
 
     def add_instance_id(self, instance_id: str) -> None:
-        if setupapi.SetupDiOpenDeviceInfoW(self.dev_info_set, instance_id, None, 0, self.dev_info_data) == 0:
+        if SetupDiOpenDeviceInfoW(self.dev_info_set, instance_id, None, 0, self._dev_info_data_ref) == 0:
             raise_last_error('internal error (SetupDiOpenDeviceInfoW)')
 
     def get_device_path_for_guid(self, interface_guid: GUID) -> Optional[str]:
-        self.dev_intf_data = SP_DEVICE_INTERFACE_DATA()
-        if setupapi.SetupDiEnumDeviceInterfaces(self.dev_info_set, None, byref(interface_guid), 0,
-                                                byref(self.dev_intf_data)) == 0:
+        # reuse interface data; clear everything except for cbSize
+        intf_data = self._reusable_intf_data
+        memset(addressof(intf_data) + _INTF_DATA_CLEAR_OFFSET, 0, sizeof(intf_data) - _INTF_DATA_CLEAR_OFFSET)
+        self.dev_intf_data = intf_data
+        if SetupDiEnumDeviceInterfaces(self.dev_info_set, None, byref(interface_guid), 0,
+                                       byref(self.dev_intf_data)) == 0:
             raise_last_error('internal error (SetupDiEnumDeviceInterfaces)')
 
-        detail_data = SP_DEVICE_INTERFACE_DETAIL_DATA_W()
-        if setupapi.SetupDiGetDeviceInterfaceDetailW(self.dev_info_set, self.dev_intf_data, byref(detail_data),
-                                                     sizeof(detail_data) - 4, None, None) == 0:
+        detail_data = create_detail_data_buffer()
+        if SetupDiGetDeviceInterfaceDetailW(self.dev_info_set, self.dev_intf_data,
+                                            cast(detail_data, PSP_DEVICE_INTERFACE_DETAIL_DATA_W),
+                                            sizeof(detail_data), None, None) == 0:
             raise_last_error('internal error (SetupDiGetDeviceInterfaceDetailW)')
-        return wstring_at(detail_data.DevicePath)
+        return wstring_at(addressof(detail_data) + DETAIL_DATA_PATH_OFFSET)
 
     def get_device_path_by_guid(self, instance_id: str) -> Optional[str]:
         """
@@ -165,22 +256,31 @@ class DeviceInfoSet:
         :param instance_id: The device instance ID.
         :return: The device path.
         """
-        guids = self.find_device_interface_guids()
-        for guid in guids:
-            clsid = CLSID()
-            if ole32.CLSIDFromString(guid, byref(clsid)) != 0:
-                continue
+        with _guid_cache_lock:
+            guids = _guid_cache.get(instance_id)
+            if guids is not None:
+                _guid_cache.move_to_end(instance_id)
+        if guids is None:
+            guids = guids_from_strings(self.find_device_interface_guids())
+            # Do not cache an empty result: the GUIDs of composite functions
+            # are registered with a delay and a later retry must see them.
+            if len(guids) > 0:
+                with _guid_cache_lock:
+                    _guid_cache[instance_id] = guids
+                    if len(_guid_cache) > GUID_CACHE_SIZE:
+                        _guid_cache.popitem(last=False)
 
+        for guid in guids:
             try:
-                return self.get_device_path(instance_id, clsid)
+                return self.get_device_path(instance_id, guid)
             except Union[USBError, WindowsError]:
                 continue
 
         return None
 
     def find_device_interface_guids(self) -> list[str]:
-        reg_key = setupapi.SetupDiOpenDevRegKey(self.dev_info_set, self.dev_info_data, DICS_FLAG_GLOBAL, 0, DIREG_DEV,
-                                                KEY_READ)
+        reg_key = SetupDiOpenDevRegKey(self.dev_info_set, self._dev_info_data_ref, DICS_FLAG_GLOBAL, 0, DIREG_DEV,
+                                       KEY_READ)
         if reg_key == -1:
             raise_last_error('internal error (SetupDiOpenDevRegKey)')
 
@@ -215,7 +315,7 @@ class DeviceInfoSet:
         if property_value is None:
             return None
 
-        return string_list_from_bytes(bytes(property_value))
+        return string_list_from_bytes(property_value)
 
     def get_int_property(self, property_key: DEVPROPKEY) -> int:
         """
@@ -226,38 +326,41 @@ class DeviceInfoSet:
         """
         actual_property_type = wintypes.DWORD()
         property_value = wintypes.DWORD()
-        if setupapi.SetupDiGetDevicePropertyW(self.dev_info_set, self.dev_info_data, byref(property_key),
-                                              byref(actual_property_type), cast(byref(property_value), wintypes.PBYTE),
-                                              sizeof(property_value), None, 0) == 0:
+        if SetupDiGetDevicePropertyW(self.dev_info_set, self._dev_info_data_ref, property_key,
+                                     actual_property_type, cast(byref(property_value), wintypes.PBYTE),
+                                     sizeof(property_value), None, 0) == 0:
             raise_last_error('internal error (SetupDiGetDevicePropertyW - 3)')
 
         if actual_property_type.value != DEVPROP_TYPE_UINT32:
             raise USBError('internal error (unexpected property type - 3)')
         return property_value.value
 
-    def get_variable_length_property(self, property_key: DEVPROPKEY, property_type: int) -> Optional[c_char_p]:
+    def get_variable_length_property(self, property_key: DEVPROPKEY, property_type: int) -> Optional[bytes]:
+        # the property key and the DWORD outputs are passed by reference implicitly (see argtypes)
         actual_property_type = wintypes.DWORD()
         required_size = wintypes.DWORD()
-        if setupapi.SetupDiGetDevicePropertyW(self.dev_info_set, self.dev_info_data, byref(property_key),
-                                              byref(actual_property_type), None, 0, byref(required_size), 0) == 0:
+        if SetupDiGetDevicePropertyW(self.dev_info_set, self._dev_info_data_ref, property_key,
+                                     actual_property_type, cast(self._prop_buf, wintypes.PBYTE),
+                                     self._prop_buf_size, required_size, 0) == 0:
             last_error = get_last_error()
             if last_error == ERROR_NOT_FOUND:
                 return None
             if last_error != ERROR_INSUFFICIENT_BUFFER:
                 raise_error(last_error, 'internal error(SetupDiGetDevicePropertyW)')
 
+            # grow reusable buffer and retry
+            self._prop_buf_size = required_size.value
+            self._prop_buf = create_string_buffer(self._prop_buf_size)
+            if SetupDiGetDevicePropertyW(self.dev_info_set, self._dev_info_data_ref, property_key,
+                                         actual_property_type, cast(self._prop_buf, wintypes.PBYTE),
+                                         self._prop_buf_size, required_size, 0) == 0:
+                raise_last_error('internal error (SetupDiGetDevicePropertyW - 2)')
+
         if actual_property_type.value != property_type:
             raise USBError('internal error (unexpected property type)')
 
-        buffer = create_string_buffer(required_size.value)
-
-        if setupapi.SetupDiGetDevicePropertyW(self.dev_info_set, self.dev_info_data, byref(property_key),
-                                              byref(actual_property_type), cast(buffer, wintypes.PBYTE),
-                                              required_size.value, None, 0) == 0:
-            raise_last_error('internal error (SetupDiGetDevicePropertyW - 2)')
-
-        return buffer
+        return string_at(self._prop_buf, required_size.value)
 
     def is_composite(self) -> bool:
-        device_service = self.get_string_property(DEVPKEY_Device_Service)
-        return 'usbccgp'.casefold() == device_service.casefold()
+        # service names are ASCII, so lower() is sufficient
+        return self.get_string_property(DEVPKEY_Device_Service).lower() == _USBCCGP
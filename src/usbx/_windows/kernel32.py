@@ -6,6 +6,9 @@
 import ctypes
 from ctypes import c_void_p
 from ctypes.wintypes import LPCWSTR, DWORD, HANDLE, BOOL, LPVOID, LPDWORD, HMODULE
+from typing import Callable, Optional
+
+from ..exceptions import USBError
 
 
 def create_lib() -> object:
@@ -23,6 +26,9 @@ def create_lib() -> object:
     lib.GetModuleHandleW.argtypes = [LPCWSTR]
     lib.GetModuleHandleW.restype = HMODULE
 
+    lib.LoadLibraryExW.argtypes = [LPCWSTR, HANDLE, DWORD]
+    lib.LoadLibraryExW.restype = HMODULE
+
     return lib
 
 
@@ -40,4 +46,48 @@ OPEN_EXISTING = 3
 FILE_ATTRIBUTE_NORMAL = 128
 FILE_FLAG_OVERLAPPED = 0x40000000
 
+LOAD_LIBRARY_SEARCH_SYSTEM32 = 0x00000800
+
 kernel32 = create_lib()
+
+
+def load_library(name: str) -> ctypes.WinDLL:
+    """
+    Loads the specified DLL.
+
+    If the DLL is already loaded into the process, the existing module handle
+    is used and the library search by ``LoadLibrary`` is skipped. Otherwise,
+    the DLL is only searched for in the system directory.
+
+    :param name: DLL name.
+    :return: *ctypes* library instance.
+    """
+    handle = kernel32.GetModuleHandleW(name)
+    if not handle:
+        handle = kernel32.LoadLibraryExW(name, None, LOAD_LIBRARY_SEARCH_SYSTEM32)
+    if handle:
+        return ctypes.WinDLL(name, use_last_error=True, handle=handle)
+    return ctypes.WinDLL(name, use_last_error=True)
+
+
+class LazyLibrary:
+    """
+    Proxy for a *ctypes* library that is only loaded when it is first used.
+
+    Functions are resolved once and then bound to the proxy.
+    If the library cannot be loaded, a :class:`USBError` is raised.
+    """
+
+    def __init__(self, create: Callable[[], ctypes.WinDLL]):
+        self._create = create
+        self._lib: Optional[ctypes.WinDLL] = None
+
+    def __getattr__(self, name: str):
+        if self._lib is None:
+            try:
+                self._lib = self._create()
+            except OSError as err:
+                raise USBError(f'Failed to load library: {err}') from err
+        func = getattr(self._lib, name)
+        setattr(self, name, func)
+        return func
@@ -4,10 +4,11 @@
 # https://opensource.org/licenses/MIT
 
 import ctypes
-import uuid
 from ctypes import HRESULT, Structure, c_ulong, c_ushort, c_ubyte, POINTER
 from ctypes.wintypes import LPCOLESTR
 
+from .kernel32 import load_library
+
 
 class GUID(Structure):
     _fields_ = [
@@ -20,18 +21,19 @@ class GUID(Structure):
     def __init__(self, guid=None):
         super().__init__()
         if guid is not None:
-            data = uuid.UUID(guid)
-            self.Data1 = data.time_low
-            self.Data2 = data.time_mid
-            self.Data3 = data.time_hi_version
-            self.Data4[0] = data.clock_seq_hi_variant
-            self.Data4[1] = data.clock_seq_low
-            self.Data4[2:] = data.node.to_bytes(6, 'big')
+            # expected format: {xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx} (braces optional)
+            s = guid.strip('{}')
+            if len(s) != 36 or s[8] != '-' or s[13] != '-' or s[18] != '-' or s[23] != '-':
+                raise ValueError(f'badly formed GUID string: {guid}')
+            self.Data1 = int(s[0:8], 16)
+            self.Data2 = int(s[9:13], 16)
+            self.Data3 = int(s[14:18], 16)
+            ctypes.memmove(self.Data4, bytes.fromhex(s[19:23] + s[24:36]), 8)
 
     def __repr__(self) -> str:
-        guid = uuid.UUID(fields=(self.Data1, self.Data2, self.Data3, self.Data4[0], self.Data4[1],
-                                 int.from_bytes(self.Data4[2:], 'big')))
-        return str(guid)
+        # same format as str(uuid.UUID): xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx
+        data4 = bytes(self.Data4)
+        return '%08x-%04x-%04x-%s-%s' % (self.Data1, self.Data2, self.Data3, data4[:2].hex(), data4[2:].hex())
 
 
 PGUID = POINTER(GUID)
@@ -40,7 +42,7 @@ PCLSID = POINTER(CLSID)
 
 
 def create_lib():
-    lib = ctypes.WinDLL('ole32', use_last_error=True)
+    lib = load_library('ole32')
 
     lib.CLSIDFromString.argtypes = [LPCOLESTR, PCLSID]
     lib.CLSIDFromString.restype = HRESULT
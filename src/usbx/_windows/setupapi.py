@@ -8,6 +8,7 @@ from ctypes import POINTER, Structure
 from ctypes.wintypes import HWND, BOOL, DWORD, PDWORD, LPCWSTR as PCWSTR, WCHAR, WPARAM, HANDLE, ULONG, PWCHAR, \
     PBYTE, HKEY
 
+from .kernel32 import load_library
 from .ole32 import GUID, PGUID
 
 ULONG_PTR = WPARAM
@@ -27,9 +28,10 @@ class SP_DEVINFO_DATA(Structure):
 
     def __init__(self):
         super().__init__()
-        self.cbSize = ctypes.sizeof(SP_DEVINFO_DATA)
+        self.cbSize = SP_DEVINFO_DATA._cbSize
 
 
+SP_DEVINFO_DATA._cbSize = ctypes.sizeof(SP_DEVINFO_DATA)
 PSP_DEVINFO_DATA = POINTER(SP_DEVINFO_DATA)
 
 
@@ -43,9 +45,10 @@ class SP_DEVICE_INTERFACE_DATA(Structure):
 
     def __init__(self):
         super().__init__()
-        self.cbSize = ctypes.sizeof(SP_DEVICE_INTERFACE_DATA)
+        self.cbSize = SP_DEVICE_INTERFACE_DATA._cbSize
 
 
+SP_DEVICE_INTERFACE_DATA._cbSize = ctypes.sizeof(SP_DEVICE_INTERFACE_DATA)
 PSP_DEVICE_INTERFACE_DATA = POINTER(SP_DEVICE_INTERFACE_DATA)
 
 
@@ -71,7 +74,7 @@ class DEVPROPKEY(Structure):
 
 
 def create_lib() -> object:
-    lib = ctypes.WinDLL('setupapi.dll', use_last_error=True)
+    lib = load_library('setupapi.dll')
 
     lib.SetupDiGetClassDevsW.argtypes = [PGUID, PWCHAR, HWND, DWORD]
     lib.SetupDiGetClassDevsW.restype = HDEVINFO
@@ -136,3 +139,16 @@ DICS_FLAG_GLOBAL = 1
 DIREG_DEV = 1
 
 setupapi = create_lib()
+
+# Function pointers resolved once (avoids the attribute lookups on the library object for each call)
+SetupDiGetClassDevsW = setupapi.SetupDiGetClassDevsW
+SetupDiEnumDeviceInfo = setupapi.SetupDiEnumDeviceInfo
+SetupDiGetDevicePropertyW = setupapi.SetupDiGetDevicePropertyW
+SetupDiDeleteDeviceInterfaceData = setupapi.SetupDiDeleteDeviceInterfaceData
+SetupDiDestroyDeviceInfoList = setupapi.SetupDiDestroyDeviceInfoList
+SetupDiEnumDeviceInterfaces = setupapi.SetupDiEnumDeviceInterfaces
+SetupDiGetDeviceInterfaceDetailW = setupapi.SetupDiGetDeviceInterfaceDetailW
+SetupDiCreateDeviceInfoList = setupapi.SetupDiCreateDeviceInfoList
+SetupDiOpenDeviceInterfaceW = setupapi.SetupDiOpenDeviceInterfaceW
+SetupDiOpenDeviceInfoW = setupapi.SetupDiOpenDeviceInfoW
+SetupDiOpenDevRegKey = setupapi.SetupDiOpenDevRegKey
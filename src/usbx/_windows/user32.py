@@ -3,11 +3,11 @@
 # Licensed under MIT License
 # https://opensource.org/licenses/MIT
 
-import ctypes
 from ctypes import c_int, Structure, WINFUNCTYPE, POINTER, sizeof, c_wchar
 from ctypes.wintypes import HICON, LPCWSTR, HBRUSH, HINSTANCE, UINT, HANDLE, HWND, WPARAM, LPARAM, ATOM, DWORD, HMENU, \
     LPVOID, BOOL, LPMSG
 
+from .kernel32 import load_library
 from .ole32 import GUID
 
 LRESULT = LPARAM
@@ -32,7 +32,10 @@ class WNDCLASSEXW(Structure):
 
     def __init__(self):
         super().__init__()
-        self.cbSize = sizeof(self)
+        self.cbSize = WNDCLASSEXW._cbSize
+
+
+WNDCLASSEXW._cbSize = sizeof(WNDCLASSEXW)
 
 
 class DEV_BROADCAST_DEVICEINTERFACE_W(Structure):
@@ -46,7 +49,10 @@ class DEV_BROADCAST_DEVICEINTERFACE_W(Structure):
 
     def __init__(self):
         super().__init__()
-        self.dbcc_size = sizeof(self)
+        self.dbcc_size = DEV_BROADCAST_DEVICEINTERFACE_W._dbcc_size
+
+
+DEV_BROADCAST_DEVICEINTERFACE_W._dbcc_size = sizeof(DEV_BROADCAST_DEVICEINTERFACE_W)
 
 
 HWND_MESSAGE = HWND(-3)
@@ -58,7 +64,7 @@ DBT_DEVICEREMOVECOMPLETE = 32772
 
 
 def create_lib() -> object:
-    lib = ctypes.WinDLL('user32.dll', use_last_error=True)
+    lib = load_library('user32.dll')
 
     lib.RegisterClassExW.argtypes = [POINTER(WNDCLASSEXW)]
     lib.RegisterClassExW.restype = ATOM
@@ -5,6 +5,8 @@
 
 import logging
 import re
+import struct
+import threading
 import time
 from ctypes import byref, sizeof
 from ctypes.wintypes import HANDLE, ULONG
@@ -15,12 +17,13 @@ from .kernel32 import kernel32, GENERIC_WRITE, GENERIC_READ, FILE_SHARE_WRITE, F
     FILE_ATTRIBUTE_NORMAL, FILE_FLAG_OVERLAPPED
 from .setupapi import DEVPKEY_Device_Children, DEVPKEY_Device_HardwareIds
 from .winerror import raise_last_usb_error
-from .winusb import winusb, WINUSB_INTERFACE_HANDLE, WINUSB_SETUP_PACKET, PUCHAR, PIPE_TRANSFER_TIMEOUT
+from .winusb import winusb, WINUSB_INTERFACE_HANDLE, WINUSB_SETUP_PACKET, PUCHAR, PIPE_TRANSFER_TIMEOUT, \
+    get_thread_setup_packet, RAW_IO, UCHAR
 from .._common.devicebase import DeviceBase
 from ..configuration import Interface, Endpoint
 from ..exceptions import USBError
 from ..controltransfer import ControlTransfer
-from ..enums import TransferDirection, Recipient
+from ..enums import TransferDirection, Recipient, TransferType
 from .._common.ctypesfunc import readable_buffer, writable_buffer
 
 
@@ -34,10 +37,45 @@ class InterfaceHandle:
         self.is_claimed: bool = False
 
 
+_ULONG_SIZE = sizeof(ULONG)
+
+# layout of WINUSB_SETUP_PACKET
+_SETUP_PACKET_STRUCT = struct.Struct('<BBHHH')
+
+
 def create_winusb_setup_packet(transfer: ControlTransfer, direction: TransferDirection) -> WINUSB_SETUP_PACKET:
-    bm_request = ((0x80 if direction == TransferDirection.IN else 0x00) | (transfer.request_type.value << 5) |
-                  transfer.recipient.value)
-    return WINUSB_SETUP_PACKET(bm_request, transfer.request, transfer.value, transfer.index, 0)
+    bm_request = (direction << 7) | transfer.bm_request_type
+    # reuse the thread's setup packet; packing the bytes is much faster than assigning the fields
+    setup_packet = get_thread_setup_packet()
+    _SETUP_PACKET_STRUCT.pack_into(setup_packet, 0, bm_request, transfer.request, transfer.value, transfer.index, 0)
+    return setup_packet
+
+
+_thread_local = threading.local()
+
+
+def acquire_buffer(length: int) -> bytearray:
+    """
+    Gets a buffer of the given length from the calling thread's pool (or creates a new one).
+
+    :param length: buffer length (in bytes)
+    :return: buffer
+    """
+    pool: Optional[dict[int, bytearray]] = getattr(_thread_local, 'buffers', None)
+    if pool is None:
+        pool = {}
+        _thread_local.buffers = pool
+    buffer = pool.pop(length, None)
+    return buffer if buffer is not None else bytearray(length)
+
+
+def release_buffer(buffer: bytearray) -> None:
+    """
+    Returns a buffer to the calling thread's pool.
+
+    :param buffer: buffer acquired with :func:`acquire_buffer`
+    """
+    _thread_local.buffers[len(buffer)] = buffer
 
 
 class WindowsDevice(DeviceBase):
@@ -46,11 +84,26 @@ class WindowsDevice(DeviceBase):
             first_intf_number = self.configuration.get_function(intf.number).first_intf_number
             return InterfaceHandle(intf.number, first_intf_number)
 
-        super().__init__(device_path.casefold())
+        super().__init__(device_path.lower())  # device paths are ASCII
         self.is_composite: bool = is_composite
         self.set_descriptors(device_desc, config_desc)
         self.interface_handles: list[InterfaceHandle] = list(map(handle_for_intf, self.configuration.interfaces))
+        self._interface_handle_by_number: dict[int, InterfaceHandle] = {h.number: h for h in self.interface_handles}
+        # WinUSB handle used for control transfers to the device (any claimed interface); updated on claim/release
+        self._default_winusb_handle: Optional[HANDLE] = None
+        # WinUSB handle, endpoint address, endpoint and interface of checked endpoints (for transfers)
+        self._endpoint_dispatch: dict[tuple[int, TransferDirection],
+                                      tuple[WINUSB_INTERFACE_HANDLE, int, Endpoint, Interface]] = {}
+        # transfer timeout (in ms) last set as pipe policy, keyed by endpoint address
+        self._pipe_timeouts: dict[int, int] = {}
+        # reusable receive buffers (as memory views and pointers) and transferred lengths, keyed by endpoint address
+        self._rx_buffers: dict[int, tuple[memoryview, PUCHAR, ULONG]] = {}
         self.device_paths: dict[int, str] = {}
+        # children instance IDs (with timestamp) and interface numbers of children, to speed up claim retries
+        self._children_cache: Optional[tuple[float, list[str]]] = None
+        self._child_intf_numbers: dict[str, int] = {}
+        # time of the last unsuccessful device path lookup, keyed by interface number
+        self._failed_path_lookups: dict[int, float] = {}
 
     def open(self) -> None:
         with self._device_lock:
@@ -71,25 +124,37 @@ class WindowsDevice(DeviceBase):
                     kernel32.CloseHandle(intf.device_handle)
                     intf.device_handle = None
                     intf.device_open_count = 0
+            self._default_winusb_handle = None
+            self._pipe_timeouts.clear()
+            self._endpoint_dispatch.clear()
+            self._rx_buffers.clear()
+
+    def remove_cached_interface_guids(self) -> None:
+        """
+        Removes the cached interface GUIDs of the composite functions (children) of this device.
+        """
+        DeviceInfoSet.remove_cached_interface_guids(list(self._child_intf_numbers))
 
     def claim_interface(self, number: int) -> None:
         # When a device is plugged in, a notification is sent. For composite devices, it is a notification
         # that the composite device is ready. Each composite function will be registered separately and
         # the related information will be available with a delay. So for composite functions, several
         # retries might be needed until the device path is available.
-        num_retries = 30  # 30 x 100ms
+        # Retry quickly at first, then back off up to 100ms (about 3s in total).
+        deadline = time.monotonic() + 3.0
+        delay = 0.005
         while True:
             if self.try_claim_interface(number):
                 return  # success
 
-            num_retries -= 1
-            if num_retries == 0:
+            if time.monotonic() >= deadline:
                 raise USBError('claiming interface failed (function has no device path / interface GUID, '
                                    'might be missing WinUSB driver)')
 
             # sleep and retry
-            logging.debug('Sleep for 100ms...')
-            time.sleep(0.1)
+            logging.debug(f'Sleep for {delay * 1000:.0f}ms...')
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
 
     def try_claim_interface(self, number: int) -> bool:
         with self._device_lock:
@@ -139,6 +204,8 @@ class WindowsDevice(DeviceBase):
             first_intf_handle.device_open_count += 1
             intf_handle.is_claimed = True
             self.set_claimed(number, True)
+            self.update_default_winusb_handle()
+            self.enable_raw_io(intf_handle)
             return True
 
     def release_interface(self, number: int) -> None:
@@ -168,6 +235,10 @@ class WindowsDevice(DeviceBase):
 
             intf_handle.is_claimed = False
             self.set_claimed(number, False)
+            self.update_default_winusb_handle()
+            self._pipe_timeouts.clear()
+            self._endpoint_dispatch.clear()
+            self._rx_buffers.clear()
 
     def select_alternate(self, interface_number: int, alternate_number: int) -> None:
         with self._device_lock:
@@ -178,12 +249,52 @@ class WindowsDevice(DeviceBase):
                 raise_last_usb_error(f'failed to set interface {interface_number} to alternate {alternate_number}')
 
             self.set_current_alternate(interface_number, alternate_number)
+            self._pipe_timeouts.clear()
+            self._endpoint_dispatch.clear()
+            self._rx_buffers.clear()
+            self.enable_raw_io(handle)
+
+    def enable_raw_io(self, intf_handle: InterfaceHandle) -> None:
+        # With RAW_IO, WinUSB passes read requests directly to the USB stack, which improves the bulk IN
+        # throughput. It requires reads of a multiple of the packet size, which transfer_in always uses.
+        enabled = UCHAR(1)
+        for endpoint in self.get_interface(intf_handle.number).current_alternate.endpoints:
+            if endpoint.direction != TransferDirection.IN or endpoint.transfer_type != TransferType.BULK:
+                continue
+            if winusb.WinUsb_SetPipePolicy(intf_handle.winusb_handle, endpoint.address, RAW_IO, sizeof(enabled),
+                                           byref(enabled)) == 0:
+                logging.debug(f'failed to enable RAW_IO for IN endpoint {endpoint.number}')
 
     def get_interface_device_path(self, number: int) -> Optional[str]:
         device_path = self.get_cached_interface_device_path(number)
         if device_path is not None:
             return device_path
 
+        # skip the lookup if it has just failed; the children are unlikely to have changed
+        now = time.monotonic()
+        if now - self._failed_path_lookups.get(number, 0.0) < self.FAILED_PATH_LOOKUP_INTERVAL:
+            return None
+
+        children_instance_ids = self.get_children_instance_ids()
+        if children_instance_ids is not None:
+            for instance_id in children_instance_ids:
+                device_path = self.get_child_device_path(instance_id, number)
+                if device_path is not None:
+                    self._failed_path_lookups.pop(number, None)
+                    return device_path
+
+        self._failed_path_lookups[number] = now
+        return None
+
+    FAILED_PATH_LOOKUP_INTERVAL = 0.02
+
+    CHILDREN_CACHE_TTL = 0.5
+
+    def get_children_instance_ids(self) -> Optional[list[str]]:
+        now = time.monotonic()
+        if self._children_cache is not None and now - self._children_cache[0] < self.CHILDREN_CACHE_TTL:
+            return self._children_cache[1]
+
         parent_device_path = self.identifier
 
         with DeviceInfoSet.of_path(parent_device_path) as device_info_set:
@@ -192,16 +303,16 @@ class WindowsDevice(DeviceBase):
                 logging.debug(f'missing children instance IDs for device {parent_device_path}')
                 return None
 
-            logging.debug(f'children instance IDs: {children_instance_ids}')
-
-            for instance_id in children_instance_ids:
-                device_path = self.get_child_device_path(instance_id, number)
-                if device_path is not None:
-                    return device_path
-
-        return None
+        logging.debug(f'children instance IDs: {children_instance_ids}')
+        self._children_cache = (now, children_instance_ids)
+        return children_instance_ids
 
     def get_child_device_path(self, instance_id: str, number: int) -> Optional[str]:
+        # skip children already known to belong to a different interface
+        known_number = self._child_intf_numbers.get(instance_id)
+        if known_number is not None and known_number != number:
+            return None
+
         with DeviceInfoSet.of_instance(instance_id) as device_info_set:
             # get hardware IDs (to extract interface number)
             hardware_ids = device_info_set.get_string_list_property(DEVPKEY_Device_HardwareIds)
@@ -214,6 +325,7 @@ class WindowsDevice(DeviceBase):
                 logging.debug(f'child device {instance_id} has no interface number')
                 return None
 
+            self._child_intf_numbers[instance_id] = intf_number
             if intf_number != number:
                 return None
 
@@ -227,16 +339,16 @@ class WindowsDevice(DeviceBase):
             return device_path
 
     MULTIPLE_INTERFACE_ID = re.compile(r'USB\\VID_[0-9A-Fa-f]{4}&PID_[0-9A-Fa-f]{4}&MI_([0-9A-Fa-f]{2})')
+    MULTIPLE_INTERFACE_ID_PREFIX = 'USB\\VID_'
 
     def extract_interface_number(self, hardware_ids: list[str]) -> Optional[int]:
         for hardware_id in hardware_ids:
-            match = self.MULTIPLE_INTERFACE_ID.match(hardware_id)
+            if not hardware_id.startswith(self.MULTIPLE_INTERFACE_ID_PREFIX):
+                continue
+            match = self.MULTIPLE_INTERFACE_ID.fullmatch(hardware_id)
             if match is not None:
-                try:
-                    return int(match.group(1))
-                except ValueError:
-                    # ignore
-                    pass
+                # the interface number is hexadecimal
+                return int(match.group(1), 16)
         return None
 
     def get_cached_interface_device_path(self, number: int) -> Optional[str]:
@@ -245,7 +357,7 @@ class WindowsDevice(DeviceBase):
         return self.device_paths.get(number)
 
     def get_interface_handle(self, number: int) -> InterfaceHandle:
-        handle = next((handle for handle in self.interface_handles if handle.number == number), None)
+        handle = self._interface_handle_by_number.get(number)
         if handle is None:
             raise USBError(f'device has no interface {number}')
         return handle
@@ -256,18 +368,20 @@ class WindowsDevice(DeviceBase):
             handle = self.get_winusb_handle(transfer.recipient, transfer.index)
 
         setup_packet = create_winusb_setup_packet(transfer, TransferDirection.IN)
-        buffer = bytearray(length)
+        buffer = acquire_buffer(length)
         length_transferred = ULONG()
         if winusb.WinUsb_ControlTransfer(
                 handle,
                 setup_packet,
-                writable_buffer(buffer, PUCHAR),
+                writable_buffer(buffer, None),
                 length,
-                byref(length_transferred),
+                length_transferred,
                 None
         ) == 0:
             raise_last_usb_error('control transfer IN failed')
-        return bytes(buffer[:length_transferred.value])
+        data = bytes(memoryview(buffer)[:length_transferred.value])
+        release_buffer(buffer)
+        return data
 
     def control_transfer_out(self, transfer: ControlTransfer, data: bytes = None) -> None:
         with self._device_lock:
@@ -276,70 +390,93 @@ class WindowsDevice(DeviceBase):
 
         setup_packet = create_winusb_setup_packet(transfer, TransferDirection.OUT)
         length = len(data) if data is not None else 0
-        buffer = readable_buffer(data, PUCHAR) if data is not None else None
+        buffer = readable_buffer(data, None) if data is not None else None
         length_transferred = ULONG()
         if winusb.WinUsb_ControlTransfer(
                 handle,
                 setup_packet,
                 buffer,
                 length,
-                byref(length_transferred),
+                length_transferred,
                 None
         ) == 0:
             raise_last_usb_error('control transfer OUT failed')
 
     def transfer_in(self, endpoint_number: int, timeout: Optional[float] = None) -> bytes:
         with self._device_lock:
-            endpoint, interface = self.get_and_check_endpoint_and_interface(endpoint_number, TransferDirection.IN)
-            handle = self.get_interface_handle(interface.number).winusb_handle
+            handle, address, endpoint, _ = self.get_endpoint_dispatch(endpoint_number, TransferDirection.IN)
+            self.set_pipe_timeout(handle, address, timeout)
 
-        address = Endpoint.get_address(endpoint_number, TransferDirection.IN)
-        timeout_value = ULONG(int(timeout * 1000 + 0.5) if timeout is not None else 0)
-        if winusb.WinUsb_SetPipePolicy(handle, address, PIPE_TRANSFER_TIMEOUT, sizeof(timeout_value),
-                                       byref(timeout_value)) == 0:
-            raise_last_usb_error(f'internal error: unable to set pipe policy for IN endpoint {endpoint_number}')
+        # take the buffer out of the dictionary while in use so concurrent transfers do not share it
+        rx_buffer = self._rx_buffers.pop(address, None)
+        if rx_buffer is None or len(rx_buffer[0]) != endpoint.max_packet_size:
+            buffer = bytearray(endpoint.max_packet_size)
+            rx_buffer = (memoryview(buffer), writable_buffer(buffer, PUCHAR), ULONG())
+        buffer_view, buffer_ptr, transferred = rx_buffer
 
-        buffer = bytearray(endpoint.max_packet_size)
-        transferred = ULONG()
-        if winusb.WinUsb_ReadPipe(handle, address, writable_buffer(buffer, PUCHAR),
-                                  endpoint.max_packet_size, byref(transferred), None) == 0:
+        if winusb.WinUsb_ReadPipe(handle, address, buffer_ptr, endpoint.max_packet_size, transferred, None) == 0:
             raise_last_usb_error(f'transfer IN from endpoint {endpoint_number} failed')
-        return bytes(buffer[:transferred.value])
+        data = bytes(buffer_view[:transferred.value])
+        self._rx_buffers[address] = rx_buffer
+        return data
 
     def transfer_out(self, endpoint_number: int, data: bytes, timeout: Optional[float] = None) -> None:
         with self._device_lock:
-            _, interface = self.get_and_check_endpoint_and_interface(endpoint_number, TransferDirection.OUT)
-            handle = self.get_interface_handle(interface.number).winusb_handle
-
-        address = Endpoint.get_address(endpoint_number, TransferDirection.OUT)
-        timeout_value = ULONG(int(timeout * 1000 + 0.5) if timeout is not None else 0)
-        if winusb.WinUsb_SetPipePolicy(handle, address, PIPE_TRANSFER_TIMEOUT, sizeof(timeout_value),
-                                       byref(timeout_value)) == 0:
-            raise_last_usb_error(f'internal error: unable to set pipe policy for OUT endpoint {endpoint_number}')
+            handle, address, _, _ = self.get_endpoint_dispatch(endpoint_number, TransferDirection.OUT)
+            self.set_pipe_timeout(handle, address, timeout)
 
         transferred = ULONG()
-        if winusb.WinUsb_WritePipe(handle, address, readable_buffer(data, PUCHAR), len(data),
-                                   byref(transferred), None) == 0:
+        if winusb.WinUsb_WritePipe(handle, address, readable_buffer(data, None), len(data),
+                                   transferred, None) == 0:
             raise_last_usb_error(f'transfer OUT to endpoint {endpoint_number} failed')
 
     def clear_halt(self, number: int, direction: TransferDirection) -> None:
         with self._device_lock:
-            _, interface = self.get_and_check_endpoint_and_interface(number, direction)
-            handle = self.get_interface_handle(interface.number).winusb_handle
+            handle, address, _, _ = self.get_endpoint_dispatch(number, direction)
+            self._pipe_timeouts.pop(address, None)
 
-        address = Endpoint.get_address(number, direction)
         if winusb.WinUsb_ResetPipe(handle, address) == 0:
             raise_last_usb_error(f'internal error: unable to clear halt of endpoint {number} {direction.name}')
 
     def abort_transfers(self, number: int, direction: TransferDirection) -> None:
         with self._device_lock:
-            _, interface = self.get_and_check_endpoint_and_interface(number, direction)
-            handle = self.get_interface_handle(interface.number).winusb_handle
+            handle, address, _, _ = self.get_endpoint_dispatch(number, direction)
 
-        address = Endpoint.get_address(number, direction)
         if winusb.WinUsb_AbortPipe(handle, address) == 0:
             raise_last_usb_error(f'internal error: unable to abort transfer from/to endpoint {number} {direction.name}')
 
+    def get_endpoint_dispatch(self, number: int, direction: TransferDirection
+                              ) -> tuple[WINUSB_INTERFACE_HANDLE, int, Endpoint, Interface]:
+        """
+        Gets the WinUSB handle, endpoint address, endpoint and interface for a transfer.
+
+        The endpoint is checked on first use; the result is cached until an interface is released,
+        an alternate setting is selected or the device is closed.
+        :param number: Endpoint number
+        :param direction: Endpoint direction
+        :return: Tuple of WinUSB handle, endpoint address, endpoint and interface descriptor
+        """
+        key = (number, direction)
+        entry = self._endpoint_dispatch.get(key)
+        if entry is None:
+            endpoint, interface = self.get_and_check_endpoint_and_interface(number, direction)
+            entry = (self.get_interface_handle(interface.number).winusb_handle, endpoint.address, endpoint, interface)
+            self._endpoint_dispatch[key] = entry
+        return entry
+
+    def set_pipe_timeout(self, handle: WINUSB_INTERFACE_HANDLE, address: int, timeout: Optional[float]) -> None:
+        # the pipe policy is only set if the timeout has changed since the last transfer;
+        # must be called with the device lock held so the cache always matches the policy set
+        timeout_ms = int(timeout * 1000 + 0.5) if timeout is not None else 0
+        if self._pipe_timeouts.get(address) == timeout_ms:
+            return
+
+        timeout_value = ULONG(timeout_ms)
+        if winusb.WinUsb_SetPipePolicy(handle, address, PIPE_TRANSFER_TIMEOUT, _ULONG_SIZE,
+                                       byref(timeout_value)) == 0:
+            direction = 'IN' if address & 0x80 != 0 else 'OUT'
+            raise_last_usb_error(f'internal error: unable to set pipe policy for {direction} endpoint {address & 0x7f}')
+        self._pipe_timeouts[address] = timeout_ms
 
     def get_winusb_handle(self, recipient: Recipient, index: int) -> WINUSB_INTERFACE_HANDLE:
         if recipient == Recipient.INTERFACE:
@@ -351,8 +488,11 @@ class WindowsDevice(DeviceBase):
             return self.get_interface_handle(intf.number).winusb_handle
 
         # for control transfer to device, use any claimed interface
-        for intf_handle in self.interface_handles:
-            if intf_handle.winusb_handle is not None:
-                return intf_handle.winusb_handle
+        if self._default_winusb_handle is not None:
+            return self._default_winusb_handle
 
         raise USBError('control transfer to device not possible as no interface has been claimed')
+
+    def update_default_winusb_handle(self) -> None:
+        self._default_winusb_handle = next((intf_handle.winusb_handle for intf_handle in self.interface_handles
+                                            if intf_handle.winusb_handle is not None), None)
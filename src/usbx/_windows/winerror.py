@@ -25,13 +25,18 @@ def raise_last_error(msg: str) -> None:
     raise_error(get_last_error(), msg)
 
 
+# Windows error codes with a specific exception (exception class and message)
+_USB_ERRORS = {
+    ERROR_SEM_TIMEOUT: (TransferTimeoutError, 'transfer timed out'),
+    ERROR_GEN_FAILURE: (StallError, 'endpoint has stalled'),
+}
+
+
 def raise_last_usb_error(msg: str) -> None:
     error_code = get_last_error()
-    if error_code == ERROR_SEM_TIMEOUT:
-        raise TransferTimeoutError('transfer timed out')
-
-    if error_code == ERROR_GEN_FAILURE:
-        raise StallError('endpoint has stalled')
+    usb_error = _USB_ERRORS.get(error_code)
+    if usb_error is not None:
+        raise usb_error[0](usb_error[1])
 
     err_msg = FormatError(error_code)
     raise USBError(f'{msg} - {err_msg}')
@@ -3,14 +3,16 @@
 # Licensed under MIT License
 # https://opensource.org/licenses/MIT
 
+import array
 import logging
-import struct
-from ctypes import byref, sizeof, resize, cast, wstring_at
+from collections import OrderedDict
+from ctypes import byref, sizeof, cast, wstring_at, string_at, addressof
 from ctypes.wintypes import HANDLE, DWORD, ULONG, HWND, UINT, WPARAM, LPARAM, MSG, LPCWSTR
 from typing import Optional
 
 from .deviceinfoset import DeviceInfoSet
 from .kernel32 import kernel32, GENERIC_WRITE, FILE_SHARE_WRITE, OPEN_EXISTING
+from .ole32 import GUID
 from .setupapi import GUID_DEVINTERFACE_USB_DEVICE, DEVPKEY_Device_InstanceId, DEVPKEY_Device_Address, \
     DEVPKEY_Device_Parent, GUID_DEVINTERFACE_USB_HUB
 from .user32 import user32, WNDCLASSEXW, DEV_BROADCAST_DEVICEINTERFACE_W, WNDPROC, HWND_MESSAGE, \
@@ -19,13 +21,33 @@ from .user32 import user32, WNDCLASSEXW, DEV_BROADCAST_DEVICEINTERFACE_W, WNDPRO
 from .windevice import WindowsDevice
 from .winerror import raise_last_error
 from .winusb import USB_NODE_CONNECTION_INFORMATION_EX, IOCTL_USB_GET_NODE_CONNECTION_INFORMATION_EX, SetupPacket, \
-    USB_DESCRIPTOR_REQUEST, IOCTL_USB_GET_DESCRIPTOR_FROM_NODE_CONNECTION
+    make_descriptor_request, IOCTL_USB_GET_DESCRIPTOR_FROM_NODE_CONNECTION
 from .._common.registrybase import DeviceRegistryBase
 from ..device import Device
 from ..exceptions import USBError
 
 
+# offset of the descriptor data within USB_DESCRIPTOR_REQUEST
+# (and the variants created by make_descriptor_request)
+DESCRIPTOR_REQUEST_DATA_OFFSET = sizeof(ULONG) + sizeof(SetupPacket)
+
+_USB_HUB_GUID_BYTES = bytes(GUID_DEVINTERFACE_USB_HUB)
+
+
 class WindowsDeviceRegistry(DeviceRegistryBase):
+    def __init__(self):
+        super().__init__()
+        # String descriptors are the same for all devices of the same model, except for the serial number.
+        # Caching them saves several IOCTLs per device if devices are reconnected.
+        # The caches are only accessed from the monitor thread.
+        self._languages_cache: dict[tuple[int, int, int], list[int]] = {}
+        self._string_cache: dict[tuple[int, int, int, int], str] = {}
+        # Hub handles are kept open across device arrivals (least recently used are closed first).
+        # They are keyed by the lowercase hub path and dropped when the hub is removed or replugged.
+        self._hub_handles: OrderedDict[str, HANDLE] = OrderedDict()
+        # reusable descriptor request (large enough for most configuration descriptors)
+        self._descriptor_request = make_descriptor_request(4096)()
+
     def monitor_devices(self) -> None:
         instance = kernel32.GetModuleHandleW(None)
 
@@ -53,26 +75,40 @@ class WindowsDeviceRegistry(DeviceRegistryBase):
         if notify_handle == 0:
             raise_last_error('internal error (RegisterDeviceNotificationW)')
 
-        try:
-            self.notify_enumeration_complete(self.enumerate_present_devices())
-        except Exception as exception:
-            self.notify_enumeration_failed(exception)
-            return
-
-        msg = MSG()
-        while True:
-            err = user32.GetMessageW(msg, hwnd, 0, 0)
-            if err <= 0:
-                break
+        # hub notifications are used to drop cached hub handles
+        notification_filter.dbcc_classguid = GUID_DEVINTERFACE_USB_HUB
+        hub_notify_handle = user32.RegisterDeviceNotificationW(hwnd, byref(notification_filter),
+                                                               DEVICE_NOTIFY_WINDOW_HANDLE)
+        if hub_notify_handle == 0:
+            raise_last_error('internal error (RegisterDeviceNotificationW)')
 
-        if err == -1:
-            raise_last_error('internal error (GetMessageW)')
+        try:
+            try:
+                self.notify_enumeration_complete(self.enumerate_present_devices())
+            except Exception as exception:
+                self.notify_enumeration_failed(exception)
+                return
+
+            msg = MSG()
+            while True:
+                err = user32.GetMessageW(msg, hwnd, 0, 0)
+                if err <= 0:
+                    break
+
+            if err == -1:
+                raise_last_error('internal error (GetMessageW)')
+        finally:
+            self.close_all_hub_handles()
 
     def handle_windows_message(self, hwnd: HWND, umsg: UINT, wparam: WPARAM, lparam: LPARAM) -> int:
         # check for message related to connecting / disconnecting devices
         if umsg == WM_DEVICECHANGE and (wparam == DBT_DEVICEARRIVAL or wparam == DBT_DEVICEREMOVECOMPLETE):
             device_path = wstring_at(cast(lparam + DEV_BROADCAST_DEVICEINTERFACE_W.dbcc_name.offset, LPCWSTR))
-            if wparam == DBT_DEVICEARRIVAL:
+            class_guid = string_at(lparam + DEV_BROADCAST_DEVICEINTERFACE_W.dbcc_classguid.offset, sizeof(GUID))
+            if class_guid == _USB_HUB_GUID_BYTES:
+                # a removed or replugged hub invalidates the cached handle
+                self.close_hub_handle(device_path)
+            elif wparam == DBT_DEVICEARRIVAL:
                 self.on_device_connected(device_path)
             else:
                 self.on_device_disconnected(device_path)
@@ -82,63 +118,87 @@ class WindowsDeviceRegistry(DeviceRegistryBase):
 
     def on_device_connected(self, device_path: str) -> None:
         device_info_set = DeviceInfoSet.of_path(device_path)
-        hub_handles: dict[str, HANDLE] = {}
         try:
-            device = self.create_device_from_device_info(device_info_set, device_path, hub_handles)
+            device = self.create_device_from_device_info(device_info_set, device_path)
             self.add_device(device)
         except Exception as ex:
             logging.warning(f'failed to retrieve information about device {device_path} - ignoring device', exc_info=ex)
-        finally:
-            for handle in hub_handles.values():
-                kernel32.CloseHandle(handle)
 
     def on_device_disconnected(self, device_path: str) -> None:
         try:
-            self.close_and_remove_device(device_path.casefold())
+            with self.lock:
+                device = self.find_device_by_id(device_path.lower())
+            if isinstance(device, WindowsDevice):
+                device.remove_cached_interface_guids()
+            self.close_and_remove_device(device_path.lower())
         except Exception as ex:
             logging.warning(f'unable to close device {device_path} - ignoring device', exc_info=ex)
 
+    MAX_HUB_HANDLES = 16
+
+    def get_hub_handle(self, hub_path: str) -> HANDLE:
+        key = hub_path.lower()
+        hub_handle = self._hub_handles.get(key)
+        if hub_handle is not None:
+            self._hub_handles.move_to_end(key)
+            return hub_handle
+
+        hub_handle = kernel32.CreateFileW(hub_path, GENERIC_WRITE, FILE_SHARE_WRITE, None, OPEN_EXISTING, 0, None)
+        if hub_handle == -1:
+            raise_last_error('internal error (opening hub device)')
+        self._hub_handles[key] = hub_handle
+
+        if len(self._hub_handles) > self.MAX_HUB_HANDLES:
+            _, oldest_handle = self._hub_handles.popitem(last=False)
+            kernel32.CloseHandle(oldest_handle)
+        return hub_handle
+
+    def close_hub_handle(self, hub_path: str) -> None:
+        hub_handle = self._hub_handles.pop(hub_path.lower(), None)
+        if hub_handle is not None:
+            kernel32.CloseHandle(hub_handle)
+
+    def close_all_hub_handles(self) -> None:
+        while self._hub_handles:
+            _, hub_handle = self._hub_handles.popitem()
+            kernel32.CloseHandle(hub_handle)
+
     def enumerate_present_devices(self) -> list[Device]:
         devices: list[Device] = []
         with DeviceInfoSet.of_present_devices(GUID_DEVINTERFACE_USB_DEVICE, None) as dev_info_set:
-            hub_handles: dict[str, HANDLE] = {}
-            try:
-                while dev_info_set.next():
-                    device = self.create_device_with_error_handler(dev_info_set, hub_handles)
-                    if device is not None:
-                        devices.append(device)
-            finally:
-                for handle in hub_handles.values():
-                    kernel32.CloseHandle(handle)
+            while dev_info_set.next():
+                device = self.create_device_with_error_handler(dev_info_set)
+                if device is not None:
+                    devices.append(device)
 
         return devices
 
-    def create_device_with_error_handler(self, dev_info_set: DeviceInfoSet, hub_handles: dict[str, HANDLE]
-                                         ) -> Optional[Device]:
+    def create_device_with_error_handler(self, dev_info_set: DeviceInfoSet) -> Optional[Device]:
         instance_id = '<unknown>'
         try:
             instance_id = dev_info_set.get_string_property(DEVPKEY_Device_InstanceId)
             device_path = DeviceInfoSet.get_device_path(instance_id, GUID_DEVINTERFACE_USB_DEVICE)
-            return self.create_device_from_device_info(dev_info_set, device_path, hub_handles)
+            return self.create_device_from_device_info(dev_info_set, device_path)
         except Exception as ex:
             logging.exception(
                 f'failed to retrieve information about device with instance ID {instance_id} - ignoring device',
                 exc_info=ex)
 
-    def create_device_from_device_info(self, dev_info_set: DeviceInfoSet, device_path: str,
-                                       hub_handles: dict[str, HANDLE]) -> Device:
+    def create_device_from_device_info(self, dev_info_set: DeviceInfoSet, device_path: str) -> Device:
         usb_port_num = dev_info_set.get_int_property(DEVPKEY_Device_Address)
         parent_instance_id = dev_info_set.get_string_property(DEVPKEY_Device_Parent)
         hub_path = DeviceInfoSet.get_device_path(parent_instance_id, GUID_DEVINTERFACE_USB_HUB)
+        is_composite = dev_info_set.is_composite()
 
-        hub_handle = hub_handles.get(hub_path)
-        if hub_handle is None:
-            hub_handle = kernel32.CreateFileW(hub_path, GENERIC_WRITE, FILE_SHARE_WRITE, None, OPEN_EXISTING, 0, None)
-            if hub_handle == -1:
-                raise_last_error('internal error (opening hub device)')
-            hub_handles[hub_path] = hub_handle
-
-        return self.create_device(device_path, dev_info_set.is_composite(), hub_handle, usb_port_num)
+        is_cached = hub_path.lower() in self._hub_handles
+        try:
+            return self.create_device(device_path, is_composite, self.get_hub_handle(hub_path), usb_port_num)
+        except WindowsError:
+            # the cached handle might refer to a hub that has been disconnected in the meantime
+            self.close_hub_handle(hub_path)
+            if not is_cached:
+                raise
+        return self.create_device(device_path, is_composite, self.get_hub_handle(hub_path), usb_port_num)
 
     def create_device(self, device_path: str, is_composite: bool, hub_handle: HANDLE, usb_port_num: int) -> Device:
         conn_info = USB_NODE_CONNECTION_INFORMATION_EX()
@@ -155,19 +215,42 @@ class WindowsDeviceRegistry(DeviceRegistryBase):
         device = WindowsDevice(device_path, is_composite, bytes(device_desc), config_desc)
         device.vid = device_desc.idVendor
         device.pid = device_desc.idProduct
-        languages = self.get_languages(hub_handle, usb_port_num)
-        device.manufacturer = self.get_string_descriptor(hub_handle, usb_port_num, device_desc.iManufacturer, languages)
-        device.product = self.get_string_descriptor(hub_handle, usb_port_num, device_desc.iProduct, languages)
+        model_key = (device_desc.idVendor, device_desc.idProduct, device_desc.bcdDevice)
+        languages = self._languages_cache.get(model_key)
+        if languages is None:
+            languages = self.get_languages(hub_handle, usb_port_num)
+            if languages is not None:
+                self._languages_cache[model_key] = languages
+            else:
+                languages = [0x0409]  # fallback, not cached as the failure might be temporary
+        device.manufacturer = self.get_cached_string_descriptor(hub_handle, usb_port_num, model_key,
+                                                                device_desc.iManufacturer, languages)
+        device.product = self.get_cached_string_descriptor(hub_handle, usb_port_num, model_key,
+                                                           device_desc.iProduct, languages)
+        # the serial number is specific to the device and cannot be cached
         device.serial = self.get_string_descriptor(hub_handle, usb_port_num, device_desc.iSerialNumber, languages)
         return device
 
-    def get_languages(self, hub_handle: HANDLE, usb_port_num: int) -> [int]:
+    def get_cached_string_descriptor(self, hub_handle: HANDLE, usb_port_num: int, model_key: tuple[int, int, int],
+                                     index: int, languages: [int]) -> Optional[str]:
+        key = model_key + (index,)
+        value = self._string_cache.get(key)
+        if value is not None:
+            return value
+        value = self.get_string_descriptor(hub_handle, usb_port_num, index, languages)
+        # only successful reads are cached as the failure might be temporary
+        if value is not None:
+            self._string_cache[key] = value
+        return value
+
+    def get_languages(self, hub_handle: HANDLE, usb_port_num: int) -> Optional[list[int]]:
         try:
             langs = self.get_descriptor(hub_handle, usb_port_num, 3, 0, 0)
             num_langs = (len(langs) - 2) // 2
-            return struct.unpack(f'<{num_langs}H', langs[2:])
+            # array uses native byte order, which is little-endian on Windows
+            return array.array('H', langs[2:2 + num_langs * 2]).tolist()
         except WindowsError:
-            return [0x0409]
+            return None
 
     def get_string_descriptor(self, hub_handle: HANDLE, usb_port_num: int, index: int, languages: [int]) -> Optional[str]:
         if index == 0:
@@ -189,40 +272,47 @@ class WindowsDeviceRegistry(DeviceRegistryBase):
 
     def get_descriptor(self, hub_handle: HANDLE, usb_port_num: int, descriptor_type: int, index: int,
                        language_id: int, descriptor_size: int = 0) -> bytes:
-        request_data_offset = sizeof(ULONG) + sizeof(SetupPacket)
-        initial_descriptor_size = descriptor_size if descriptor_size != 0 else 256
-        size = initial_descriptor_size + request_data_offset
-
-        request = USB_DESCRIPTOR_REQUEST()
-        if sizeof(request) < size:
-            resize(request, size)
-
-        request.ConnectionIndex = usb_port_num
-        setup_packet = request.setupPacket
-        setup_packet.bmRequest = 0x80  # device-to-host / type standard / recipient device
-        setup_packet.bRequest = 6  # GET_DESCRIPTOR
-        setup_packet.wValue = (descriptor_type << 8) | index
-        setup_packet.wIndex = language_id
-        setup_packet.wLength = initial_descriptor_size
-
-        effective_size = DWORD()
-        if kernel32.DeviceIoControl(hub_handle, IOCTL_USB_GET_DESCRIPTOR_FROM_NODE_CONNECTION, byref(request),
-                                    size, byref(request), size, byref(effective_size), None) == 0:
-            raise_last_error(f'internal error (retrieving descriptor {index} failed)')
-
-        # determine size of descriptor
-        if descriptor_type == 2:
-            # total length of configuration descriptor
-            expected_size = request.Data[2] + 256 * request.Data[3]
-        else:
-            # length byte of descriptor
-            expected_size = request.Data[0]
-
-        # check against effective size
-        if effective_size.value - request_data_offset != expected_size:
-            if descriptor_size != 0:
+        request_data_offset = DESCRIPTOR_REQUEST_DATA_OFFSET
+        request = self._descriptor_request
+        request_size = descriptor_size if descriptor_size != 0 else 256
+        is_retry = descriptor_size != 0
+
+        while True:
+            size = request_size + request_data_offset
+            if sizeof(request) < size:
+                request = make_descriptor_request(request_size)()
+                self._descriptor_request = request
+
+            request.ConnectionIndex = usb_port_num
+            setup_packet = request.setupPacket
+            setup_packet.bmRequest = 0x80  # device-to-host / type standard / recipient device
+            setup_packet.bRequest = 6  # GET_DESCRIPTOR
+            setup_packet.wValue = (descriptor_type << 8) | index
+            setup_packet.wIndex = language_id
+            setup_packet.wLength = request_size
+
+            effective_size = DWORD()
+            if kernel32.DeviceIoControl(hub_handle, IOCTL_USB_GET_DESCRIPTOR_FROM_NODE_CONNECTION, byref(request),
+                                        size, byref(request), size, byref(effective_size), None) == 0:
+                raise_last_error(f'internal error (retrieving descriptor {index} failed)')
+
+            # determine size of descriptor
+            if descriptor_type == 2:
+                # total length of configuration descriptor
+                expected_size = request.Data[2] + 256 * request.Data[3]
+            else:
+                # length byte of descriptor
+                expected_size = request.Data[0]
+
+            # check against effective size
+            if effective_size.value - request_data_offset == expected_size:
+                break
+
+            if is_retry:
                 raise USBError('internal error (unexpected descriptor size)')
 
-            return self.get_descriptor(hub_handle, usb_port_num, descriptor_type, index, language_id, expected_size)
+            # retry once with the size announced by the descriptor
+            request_size = expected_size
+            is_retry = True
 
-        return bytes(request)[request_data_offset:request_data_offset + expected_size]
+        return string_at(addressof(request) + request_data_offset, expected_size)
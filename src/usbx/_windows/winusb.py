@@ -3,9 +3,16 @@
 # Licensed under MIT License
 # https://opensource.org/licenses/MIT
 
-import ctypes
-from ctypes import Structure, POINTER, c_void_p
-from ctypes.wintypes import ULONG, BYTE as UCHAR, USHORT, BOOLEAN, DWORD, HANDLE, BOOL, PULONG
+import functools
+import threading
+from ctypes import Structure, POINTER, c_ubyte, c_void_p
+from ctypes.wintypes import ULONG, USHORT, BOOLEAN, DWORD, HANDLE, BOOL, PULONG
+
+from .kernel32 import load_library, LazyLibrary
+
+# unsigned as in the Windows headers (wintypes.BYTE is signed); PUCHAR then accepts the c_uint8
+# arrays created by readable_buffer() and writable_buffer()
+UCHAR = c_ubyte
 
 
 class USB_DEVICE_DESCRIPTOR(Structure):
@@ -58,6 +65,27 @@ class USB_DESCRIPTOR_REQUEST(Structure):
         ('Data', (UCHAR * 256))
     ]
 
+
+@functools.lru_cache(maxsize=32)
+def make_descriptor_request(length: int) -> type[Structure]:
+    """
+    Creates a variant of ``USB_DESCRIPTOR_REQUEST`` with space for ``length`` bytes of descriptor data.
+
+    The types are cached per length.
+
+    :param length: size of the ``Data`` member (in bytes).
+    :return: structure type
+    """
+    class DescriptorRequest(Structure):
+        _fields_ = [
+            ('ConnectionIndex', ULONG),
+            ('setupPacket', SetupPacket),
+            ('Data', (UCHAR * length))
+        ]
+
+    return DescriptorRequest
+
+
 class WINUSB_SETUP_PACKET(Structure):
     _fields_ = [
         ('RequestType', UCHAR),
@@ -68,53 +96,67 @@ class WINUSB_SETUP_PACKET(Structure):
     ]
 
 
-IOCTL_USB_GET_NODE_CONNECTION_INFORMATION_EX = 0x220448
+_thread_local = threading.local()
 
-IOCTL_USB_GET_DESCRIPTOR_FROM_NODE_CONNECTION = 0x220410
 
-PIPE_TRANSFER_TIMEOUT = 0x03
+def get_thread_setup_packet() -> WINUSB_SETUP_PACKET:
+    """
+    Gets the setup packet instance reserved for the calling thread.
 
+    The setup packet is passed by value, so the instance can be reused as soon as
+    ``WinUsb_ControlTransfer`` has been called.
 
-WINUSB_INTERFACE_HANDLE = c_void_p
-PWINUSB_INTERFACE_HANDLE = POINTER(WINUSB_INTERFACE_HANDLE)
-PUCHAR = POINTER(UCHAR)
+    :return: setup packet
+    """
+    packet = getattr(_thread_local, 'setup_packet', None)
+    if packet is None:
+        packet = WINUSB_SETUP_PACKET()
+        _thread_local.setup_packet = packet
+    return packet
 
 
-def create_lib():
-    lib = ctypes.WinDLL('winusb.dll', use_last_error=True)
+IOCTL_USB_GET_NODE_CONNECTION_INFORMATION_EX = 0x220448
 
-    lib.WinUsb_Initialize.argtypes = [HANDLE, PWINUSB_INTERFACE_HANDLE]
-    lib.WinUsb_Initialize.restype = BOOL
+IOCTL_USB_GET_DESCRIPTOR_FROM_NODE_CONNECTION = 0x220410
 
-    lib.WinUsb_GetAssociatedInterface.argtypes = [WINUSB_INTERFACE_HANDLE, UCHAR, PWINUSB_INTERFACE_HANDLE]
-    lib.WinUsb_GetAssociatedInterface.restype = BOOL
+PIPE_TRANSFER_TIMEOUT = 0x03
 
-    lib.WinUsb_Free.argtypes = [WINUSB_INTERFACE_HANDLE]
-    lib.WinUsb_Free.restype = BOOL
+RAW_IO = 0x07
 
-    lib.WinUsb_ControlTransfer.argtypes = [WINUSB_INTERFACE_HANDLE, WINUSB_SETUP_PACKET, PUCHAR, ULONG, PULONG,
-                                           c_void_p]
-    lib.WinUsb_ControlTransfer.restype = BOOL
 
-    lib.WinUsb_WritePipe.argtypes = [WINUSB_INTERFACE_HANDLE, UCHAR, PUCHAR, ULONG, PULONG, c_void_p]
-    lib.WinUsb_WritePipe.restype = BOOL
+WINUSB_INTERFACE_HANDLE = c_void_p
+PWINUSB_INTERFACE_HANDLE = POINTER(WINUSB_INTERFACE_HANDLE)
+PUCHAR = POINTER(UCHAR)
 
-    lib.WinUsb_ReadPipe.argtypes = [WINUSB_INTERFACE_HANDLE, UCHAR, PUCHAR, ULONG, PULONG, c_void_p]
-    lib.WinUsb_ReadPipe.restype = BOOL
 
-    lib.WinUsb_SetPipePolicy.argtypes = [WINUSB_INTERFACE_HANDLE, UCHAR, ULONG, ULONG, c_void_p]
-    lib.WinUsb_SetPipePolicy.restype = BOOL
+# Function prototypes (name, result type, argument types)
+_PROTOTYPES = (
+    ('WinUsb_Initialize', BOOL, [HANDLE, PWINUSB_INTERFACE_HANDLE]),
+    ('WinUsb_GetAssociatedInterface', BOOL, [WINUSB_INTERFACE_HANDLE, UCHAR, PWINUSB_INTERFACE_HANDLE]),
+    ('WinUsb_Free', BOOL, [WINUSB_INTERFACE_HANDLE]),
+    ('WinUsb_ControlTransfer', BOOL, [WINUSB_INTERFACE_HANDLE, WINUSB_SETUP_PACKET, PUCHAR, ULONG, PULONG, c_void_p]),
+    ('WinUsb_WritePipe', BOOL, [WINUSB_INTERFACE_HANDLE, UCHAR, PUCHAR, ULONG, PULONG, c_void_p]),
+    ('WinUsb_ReadPipe', BOOL, [WINUSB_INTERFACE_HANDLE, UCHAR, PUCHAR, ULONG, PULONG, c_void_p]),
+    ('WinUsb_SetPipePolicy', BOOL, [WINUSB_INTERFACE_HANDLE, UCHAR, ULONG, ULONG, c_void_p]),
+    ('WinUsb_SetCurrentAlternateSetting', BOOL, [WINUSB_INTERFACE_HANDLE, UCHAR]),
+    ('WinUsb_ResetPipe', BOOL, [WINUSB_INTERFACE_HANDLE, UCHAR]),
+    ('WinUsb_AbortPipe', BOOL, [WINUSB_INTERFACE_HANDLE, UCHAR]),
+)
 
-    lib.WinUsb_SetCurrentAlternateSetting.argtypes = [WINUSB_INTERFACE_HANDLE, UCHAR]
-    lib.WinUsb_SetCurrentAlternateSetting.restype = BOOL
 
-    lib.WinUsb_ResetPipe.argtypes = [WINUSB_INTERFACE_HANDLE, UCHAR]
-    lib.WinUsb_ResetPipe.restype = BOOL
+def create_lib():
+    # Functions of a WinDLL (unlike PyDLL) release the GIL during the call. So the blocking transfer
+    # functions (WinUsb_ControlTransfer, WinUsb_ReadPipe, WinUsb_WritePipe) can run concurrently
+    # on different endpoints. WindowsDevice calls them without holding the device lock.
+    lib = load_library('winusb.dll')
 
-    lib.WinUsb_AbortPipe.argtypes = [WINUSB_INTERFACE_HANDLE, UCHAR]
-    lib.WinUsb_AbortPipe.restype = BOOL
+    for name, restype, argtypes in _PROTOTYPES:
+        func = getattr(lib, name)
+        func.argtypes = argtypes
+        func.restype = restype
 
     return lib
 
 
-winusb = create_lib()
+# winusb.dll is only loaded when the first device is used
+winusb = LazyLibrary(create_lib)
@@ -5,7 +5,7 @@
 
 from typing import Optional
 
-from .enums import TransferType, TransferDirection
+from .enums import TransferType, TransferDirection, _ADDRESS_TO_DIRECTION
 
 
 class Endpoint(object):
@@ -15,6 +15,8 @@ class Endpoint(object):
     The information originates from the configuration descriptor provided by the USB device.
     """
 
+    __slots__ = ('number', 'direction', 'address', 'transfer_type', 'max_packet_size')
+
     def __init__(self, address: int, attributes: int, max_packet_size: int):
         self.number: int = Endpoint.get_number(address)
         """
@@ -27,6 +29,9 @@ class Endpoint(object):
         self.direction: TransferDirection = Endpoint.get_direction(address)
         """Transfer direction."""
 
+        self.address: int = address & 0xff
+        """Endpoint address (endpoint number and direction bit, ``bEndpointAddress``)."""
+
         self.transfer_type: TransferType = TransferType.from_attributes(attributes)
         """Transfer type."""
 
@@ -57,7 +62,7 @@ class Endpoint(object):
         :param address: Endpoint address (between 0 and 255).
         :return: Transfer direction.
         """
-        return TransferDirection.OUT if (address & 0x80) == 0 else TransferDirection.IN
+        return _ADDRESS_TO_DIRECTION[address & 0xff]
 
     @classmethod
     def get_address(cls, number: int, direction: TransferDirection) -> int:
@@ -68,7 +73,8 @@ class Endpoint(object):
         :param direction: Endpoint direction.
         :return: Endpoint address.
         """
-        return number if direction == TransferDirection.OUT else number | 0x80
+        # OUT is 0 and IN is 1, i.e. the direction is bit 7 of the address
+        return number | (direction << 7)
 
 
 class AlternateInterface(object):
@@ -81,7 +87,10 @@ class AlternateInterface(object):
     The information originates from the configuration descriptor provided by the USB device.
     """
 
-    def __init__(self, number: int, class_code: int, subclass_code: int, protocol_code: int):
+    __slots__ = ('number', 'class_code', 'subclass_code', 'protocol_code', 'endpoints')
+
+    def __init__(self, number: int, class_code: int, subclass_code: int, protocol_code: int,
+                 endpoints: Optional[list[Endpoint]] = None):
         self.number: int = number
         """Alternate setting number (``bAlternateSetting`` in USB interface descriptor)."""
 
@@ -94,7 +103,7 @@ class AlternateInterface(object):
         self.protocol_code: int = protocol_code
         """Interface protocol code (``bInterfaceProtocol`` in USB interface descriptor)."""
 
-        self.endpoints: list[Endpoint] = []
+        self.endpoints: list[Endpoint] = endpoints if endpoints is not None else []
         """USB endpoints (excluding control endpoint)."""
 
 
@@ -105,6 +114,9 @@ class Interface(object):
     The information originates from the configuration descriptor provided by the USB device.
     """
 
+    __slots__ = ('number', 'alternates', '_current_alternate', '_is_claimed', '_alternate_index',
+                 '_alternate_index_count')
+
     def __init__(self, number: int, alternates: list[AlternateInterface]):
         self.number: int = number
         """USB interface number (``bInterfaceNumber`` of USB interface descriptor)."""
@@ -116,6 +128,10 @@ class Interface(object):
 
         self._is_claimed: bool = False
 
+        # index of alternates by number (rebuilt if alternates have been added)
+        self._alternate_index: dict[int, AlternateInterface] = {}
+        self._alternate_index_count: int = 0
+
     def get_alternate(self, number: int) -> Optional[AlternateInterface]:
         """
         Get the USB alternate interface settings with number ``number``.
@@ -123,7 +139,13 @@ class Interface(object):
         :param number: USB alternate setting number.
         :return: USB alternate interface, or ``None`` if there is no alternate setting with the given number.
         """
-        return next((alternate for alternate in self.alternates if alternate.number == number), None)
+        if self._alternate_index_count != len(self.alternates):
+            index: dict[int, AlternateInterface] = {}
+            for alternate in self.alternates:
+                index.setdefault(alternate.number, alternate)
+            self._alternate_index = index
+            self._alternate_index_count = len(self.alternates)
+        return self._alternate_index.get(number)
 
     @property
     def current_alternate(self) -> AlternateInterface:
@@ -168,6 +190,8 @@ class CompositeFunction(object):
     This information originates from the configuration descriptor provided by the USB device.
     """
 
+    __slots__ = ('first_intf_number', 'interface_count', 'class_code', 'subclass_code', 'protocol_code')
+
     def __init__(self, first_intf_number: int, interface_count: int, class_code: int, subclass_code: int,
                  protocol_code: int):
 
@@ -195,6 +219,9 @@ class Configuration(object):
     configuration descriptor provided by the USB device.
     """
 
+    __slots__ = ('configuration_value', 'attributes', 'max_power', 'interfaces', 'functions', '_interface_index',
+                 '_interface_index_count', '_function_index', '_function_index_count')
+
     def __init__(self):
         self.configuration_value: int = 0
         """Value/number of this configuration (``bConfigurationValue`` of USB configuration descriptor)."""
@@ -211,6 +238,12 @@ class Configuration(object):
         self.functions: list[CompositeFunction] = []
         """USB composite functions."""
 
+        # indexes of interfaces and functions by interface number (rebuilt if the lists have changed)
+        self._interface_index: dict[int, Interface] = {}
+        self._interface_index_count: int = 0
+        self._function_index: dict[int, CompositeFunction] = {}
+        self._function_index_count: int = 0
+
     def get_interface(self, number: int) -> Optional[Interface]:
         """
         Get the USB interface with number ``number``.
@@ -218,7 +251,13 @@ class Configuration(object):
         :param number: USB interface number.
         :return: USB interface, or ``None`` if there is no interface with the given number.
         """
-        return next((interface for interface in self.interfaces if interface.number == number), None)
+        if self._interface_index_count != len(self.interfaces):
+            index: dict[int, Interface] = {}
+            for interface in self.interfaces:
+                index.setdefault(interface.number, interface)
+            self._interface_index = index
+            self._interface_index_count = len(self.interfaces)
+        return self._interface_index.get(number)
 
     def get_function(self, number: int) -> Optional[CompositeFunction]:
         """
@@ -227,7 +266,12 @@ class Configuration(object):
         :param number: USB interface number.
         :return: USB composite function, or ``None`` if there is no function for the given interface number.
         """
-        for function in self.functions:
-            if function.first_intf_number <= number < function.first_intf_number + function.interface_count:
-                return function
-        return None
+        if self._function_index_count != len(self.functions):
+            index: dict[int, CompositeFunction] = {}
+            for function in self.functions:
+                for intf_number in range(function.first_intf_number,
+                                         function.first_intf_number + function.interface_count):
+                    index.setdefault(intf_number, function)
+            self._function_index = index
+            self._function_index_count = len(self.functions)
+        return self._function_index.get(number)
@@ -31,3 +31,14 @@ class ControlTransfer:
     For requests with an interface or an endpoint as the recipient, the lower
     byte of this property must contain the interface number and the endpoint address, respectively.
     """
+
+    @property
+    def bm_request_type(self) -> int:
+        """
+        ``bmRequestType`` without the direction bit (bit 7).
+
+        The backends combine it with ``0x80`` for device-to-host transfers.
+        It is derived from the current ``request_type`` and ``recipient`` on access
+        so it stays correct if the fields are modified after construction.
+        """
+        return (self.request_type << 5) | self.recipient
@@ -24,7 +24,12 @@ class TransferType(IntEnum):
     @classmethod
     def from_attributes(cls, attributes: int) -> 'TransferType':
         """Extract the transfer type from ``bmAttributes`` of an endpoint descriptor."""
-        return TransferType(attributes & 0x03)
+        return _TRANSFER_TYPES[attributes & 0x03]
+
+
+# transfer types indexed by their value
+_TRANSFER_TYPES: tuple[TransferType, ...] = (TransferType.CONTROL, TransferType.ISOCHRONOUS, TransferType.BULK,
+                                             TransferType.INTERRUPT)
 
 
 class TransferDirection(IntEnum):
@@ -39,7 +44,12 @@ class TransferDirection(IntEnum):
     @classmethod
     def from_address(cls, address: int) -> 'TransferDirection':
         """Extract the transfer direction from an endpoint address."""
-        return TransferDirection.OUT if (address & 0x80) == 0 else TransferDirection.IN
+        return _ADDRESS_TO_DIRECTION[address & 0xff]
+
+
+# transfer direction for each endpoint address
+_ADDRESS_TO_DIRECTION: tuple[TransferDirection, ...] = tuple(
+    TransferDirection.OUT if (address & 0x80) == 0 else TransferDirection.IN for address in range(256))
 
 
 class RequestType(IntEnum):
@@ -7,8 +7,7 @@ class USBError(Exception):
     """
     Exception raised when a USB operation fails.
     """
-    def __init__(self, message: str):
-        super().__init__(message)
+    __slots__ = ()
 
 
 class StallError(USBError):
@@ -22,13 +21,11 @@ class StallError(USBError):
     clearing the halt using :meth:`Device.clear_halt`.
     The exception is control endpoint 0, which clears the halt condition automatically.
     """
-    def __init__(self, message: str):
-        super().__init__(message)
+    __slots__ = ()
 
 
 class TransferTimeoutError(USBError):
     """
     Exception raised when a USB transfer times out.
     """
-    def __init__(self, message: str):
-        super().__init__(message)
+    __slots__ = ()
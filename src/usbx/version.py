@@ -13,27 +13,53 @@ class Version:
     0x0321 represents the version 3.2.1.
 
     """
-    def __init__(self, bcd_version: int):
-        self.bcd_version: int = bcd_version
-        """Version, encoded as BCD."""
+
+    __slots__ = ('bcd_version', 'major', 'minor', 'subminor')
+
+    bcd_version: int
+    """Version, encoded as BCD."""
+
+    major: int
+    """Major version."""
+
+    minor: int
+    """Minor version."""
+
+    subminor: int
+    """Subminor version."""
+
+    def __new__(cls, bcd_version: int):
+        # instances are shared as there are few distinct versions and they are not modified
+        version = _versions.get(bcd_version)
+        if version is None:
+            version = super().__new__(cls)
+            object.__setattr__(version, 'bcd_version', bcd_version)
+            object.__setattr__(version, 'major', bcd_version >> 8)
+            object.__setattr__(version, 'minor', (bcd_version >> 4) & 0x0f)
+            object.__setattr__(version, 'subminor', bcd_version & 0x0f)
+            version = _versions.setdefault(bcd_version, version)
+        return version
+
+    def __setattr__(self, name, value):
+        # shared instances must not be modified
+        raise AttributeError(f'Version is immutable (cannot set {name})')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'Version is immutable (cannot delete {name})')
 
     def __eq__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
         return self.bcd_version == other.bcd_version
 
+    def __hash__(self):
+        return self.bcd_version
+
+    def __reduce__(self):
+        return Version, (self.bcd_version,)
+
     def __repr__(self):
         return f'{self.major}.{self.minor}.{self.subminor}'
 
-    @property
-    def major(self) -> int:
-        """Major version."""
-        return self.bcd_version >> 8
-
-    @property
-    def minor(self) -> int:
-        """Minor version."""
-        return (self.bcd_version >> 4) & 0x0f
 
-    @property
-    def subminor(self) -> int:
-        """Subminor version."""
-        return self.bcd_version & 0x0f
+_versions: dict[int, Version] = {}
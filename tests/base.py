@@ -3,6 +3,7 @@
 # Licensed under MIT License
 # https://opensource.org/licenses/MIT
 
+import platform
 import unittest
 from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
@@ -10,8 +11,20 @@ from typing import Callable
 from tests.deviceconfig import get_config
 from usbx import usb, Device, ControlTransfer, RequestType, Recipient, TransferTimeoutError
 
+IS_WINDOWS = platform.system() == 'Windows'
+
 
 class TestBase(unittest.TestCase):
+    executor: ThreadPoolExecutor
+
+    @classmethod
+    def setUpClass(cls):
+        # worker threads are shared by all tests of the class
+        cls.executor = ThreadPoolExecutor(max_workers=4)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
 
     def setUp(self):
         self.test_device: Device = usb.find_device(lambda device: get_config(device) is not None)
@@ -48,10 +61,9 @@ class TestBase(unittest.TestCase):
         self.test_device.control_transfer_out(transfer)
 
     def run_with_timeout(self, timeout: int, fn: Callable[[], None]) -> None:
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(fn)
-            try:
-                future.result(timeout=timeout)
-            except TimeoutError:
-                self.test_device.close()
-                self.fail(f'Test did not finish after {timeout} seconds')
+        future = self.executor.submit(fn)
+        try:
+            future.result(timeout=timeout)
+        except TimeoutError:
+            self.test_device.close()
+            self.fail(f'Test did not finish after {timeout} seconds')
@@ -9,10 +9,14 @@ from typing import Optional
 from usbx import Device
 
 
-@dataclass
+@dataclass(frozen=True)
 class TestDeviceConfig:
     """Test device configuration"""
 
+    # declared explicitly as dataclass(slots=True) requires Python 3.10
+    __slots__ = ('vid', 'pid', 'is_composite', 'interface_number', 'endpoint_loopback_out', 'endpoint_loopback_in',
+                 'endpoint_echo_out', 'endpoint_echo_in')
+
     vid: int
     """Vendor ID"""
 
@@ -60,6 +64,8 @@ COMPOSITE_DEVICE = TestDeviceConfig(
     -1
 )
 
+_CONFIGS = {(config.vid, config.pid): config for config in (LOOPBACK_DEVICE, COMPOSITE_DEVICE)}
+
 
 def get_config(device: Device) -> Optional[TestDeviceConfig]:
     """
@@ -68,4 +74,4 @@ def get_config(device: Device) -> Optional[TestDeviceConfig]:
     :param device: The USB device.
     :return: The test device configuration (:class:`TestDeviceConfig` instance) or ``None``
     """
-    return next((c for c in [LOOPBACK_DEVICE, COMPOSITE_DEVICE] if device.vid == c.vid and device.pid == c.pid), None)
+    return _CONFIGS.get((device.vid, device.pid))
@@ -3,7 +3,7 @@
 # Licensed under MIT License
 # https://opensource.org/licenses/MIT
 
-from concurrent.futures import ThreadPoolExecutor
+import threading
 from time import sleep
 
 from tests.base import TestBase
@@ -15,14 +15,17 @@ class TestAbort(TestBase):
         self.test_device.open()
         self.test_device.claim_interface(self.config.interface_number)
 
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            reader = executor.submit(self.read_bytes)
-            sleep(0.2)
-            self.test_device.abort_transfers(self.config.endpoint_loopback_in, TransferDirection.IN)
-            reader.result(timeout=1)
+        self.reader_ready = threading.Event()
+        reader = self.executor.submit(self.read_bytes)
+        self.assertTrue(self.reader_ready.wait(timeout=1))
+        # give the reader a moment to enter transfer_in() after signalling
+        sleep(0.02)
+        self.test_device.abort_transfers(self.config.endpoint_loopback_in, TransferDirection.IN)
+        reader.result(timeout=1)
 
     def read_bytes(self):
         try:
+            self.reader_ready.set()
             self.test_device.transfer_in(self.config.endpoint_loopback_in)
             self.fail("unexpected success on transfer in")
 
@@ -3,7 +3,6 @@
 # Licensed under MIT License
 # https://opensource.org/licenses/MIT
 
-from concurrent.futures import ThreadPoolExecutor
 from random import randbytes
 
 from tests.base import TestBase
@@ -48,24 +47,30 @@ class TestBulkTransfer(TestBase):
         num_bytes = 230763
         test_data = randbytes(num_bytes)
 
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            writer = executor.submit(self.write_bytes, test_data)
-            reader = executor.submit(self.read_bytes, num_bytes)
-            data = reader.result(timeout=10)
-            writer.result(timeout=2)
-            self.assertEqual(data, test_data)
+        writer = self.executor.submit(self.write_bytes, test_data)
+        reader = self.executor.submit(self.read_bytes, num_bytes)
+        data = reader.result(timeout=10)
+        writer.result(timeout=2)
+        self.assertEqual(data, test_data)
 
     def write_bytes(self, data: bytes) -> None:
-        chunk_size = 100
+        device = self.test_device
+        endpoint_number = self.config.endpoint_loopback_out
+        # a multiple of the packet size reduces the number of transfers
+        out_endpoint = device.get_endpoint(endpoint_number, TransferDirection.OUT)
+        chunk_size = out_endpoint.max_packet_size * 16 if out_endpoint is not None else 100
         num_bytes = 0
         while num_bytes < len(data):
-            size = min(len(data), chunk_size)
-            self.test_device.transfer_out(self.config.endpoint_loopback_out, data[num_bytes:num_bytes + size])
-            num_bytes += size
+            device.transfer_out(endpoint_number, data[num_bytes:num_bytes + chunk_size])
+            num_bytes += chunk_size
 
     def read_bytes(self, num_bytes: int) -> bytes:
-        data = bytearray()
-        while len(data) < num_bytes:
-            chunk = self.test_device.transfer_in(self.config.endpoint_loopback_in)
-            data.extend(chunk)
-        return data
+        device = self.test_device
+        endpoint_number = self.config.endpoint_loopback_in
+        data = bytearray(num_bytes)
+        pos = 0
+        while pos < num_bytes:
+            chunk = device.transfer_in(endpoint_number)
+            data[pos:pos + len(chunk)] = chunk
+            pos += len(chunk)
+        return bytes(data)
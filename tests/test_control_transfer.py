@@ -3,10 +3,9 @@
 # Licensed under MIT License
 # https://opensource.org/licenses/MIT
 
-import platform
-from unittest import SkipTest
+import unittest
 
-from tests.base import TestBase
+from tests.base import TestBase, IS_WINDOWS
 from usbx import ControlTransfer, RequestType, Recipient, USBError
 
 
@@ -80,10 +79,8 @@ class TestControlTransfer(TestBase):
         desc = self.test_device.control_transfer_in(transfer, 1000)
         self.assertEqual(desc, self.test_device.configuration_descriptor)
 
+    @unittest.skipUnless(IS_WINDOWS, 'Windows only test')
     def test_no_interface_claimed(self):
-        if platform.system() != 'Windows':
-            raise SkipTest('Windows only test')
-
         self.test_device.open()
         transfer = ControlTransfer(
             request_type=RequestType.STANDARD,
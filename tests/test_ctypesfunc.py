@@ -0,0 +1,130 @@
+# usbx – Accessing USB devices
+# Copyright (c) 2024 Manuel Bleichenbacher
+# Licensed under MIT License
+# https://opensource.org/licenses/MIT
+
+import ctypes
+import gc
+import unittest
+from ctypes import CFUNCTYPE, POINTER, c_int, c_ubyte, c_ulong
+
+from tests.base import IS_WINDOWS
+from usbx._common.ctypesfunc import readable_buffer, writable_buffer
+
+# same argument types as the buffer parameters of WinUSB (PUCHAR, ULONG)
+BUFFER_PROTOTYPE = CFUNCTYPE(c_int, POINTER(c_ubyte), c_ulong)
+
+
+class TestCTypesFunc(unittest.TestCase):
+
+    def test_readable_buffer_argument(self):
+        received = []
+
+        def callback(buffer, length):
+            received.append(ctypes.string_at(buffer, length))
+            return 1
+
+        func = BUFFER_PROTOTYPE(callback)
+        data = bytearray(b'\x01\x80\xff')
+        func(readable_buffer(data, None), len(data))
+        self.assertEqual(received, [b'\x01\x80\xff'])
+
+    def test_readable_buffer_from_bytes(self):
+        data = bytes(range(256)) * 4
+        array = readable_buffer(data, None)
+        self.assertIsInstance(array, c_ubyte * len(data))
+        self.assertEqual(bytes(array), data)
+        # points to the memory of the bytes object instead of a copy
+        self.assertEqual(ctypes.addressof(array), ctypes.cast(ctypes.c_char_p(data), ctypes.c_void_p).value)
+
+        pointer = readable_buffer(data, POINTER(c_ubyte))
+        self.assertIsInstance(pointer, POINTER(c_ubyte))
+        self.assertEqual(ctypes.string_at(pointer, len(data)), data)
+
+        void_pointer = readable_buffer(data)
+        self.assertIsInstance(void_pointer, ctypes.c_void_p)
+        self.assertEqual(ctypes.string_at(void_pointer, len(data)), data)
+
+        received = []
+
+        def callback(buffer, length):
+            received.append(ctypes.string_at(buffer, length))
+            return 1
+
+        func = BUFFER_PROTOTYPE(callback)
+        func(array, len(data))
+        func(pointer, len(data))
+        self.assertEqual(received, [data, data])
+
+    def test_readable_buffer_keeps_bytes_alive(self):
+        def create_buffers():
+            return readable_buffer(bytes(range(200)) * 5, None), readable_buffer(bytes(range(200)) * 5)
+
+        array, void_pointer = create_buffers()
+        gc.collect()
+        garbage = [bytes(1000) for _ in range(1000)]
+        self.assertEqual(bytes(array), bytes(range(200)) * 5)
+        self.assertEqual(ctypes.string_at(void_pointer, 1000), bytes(range(200)) * 5)
+        del garbage
+
+    def test_writable_buffer_argument(self):
+        def callback(buffer, length):
+            for i in range(length):
+                buffer[i] = 0xa0 + i
+            return 1
+
+        func = BUFFER_PROTOTYPE(callback)
+        data = bytearray(4)
+        func(writable_buffer(data, None), len(data))
+        self.assertEqual(data, b'\xa0\xa1\xa2\xa3')
+
+    def test_writable_pointer_argument(self):
+        def callback(buffer, length):
+            for i in range(length):
+                buffer[i] = 0xb0 + i
+            return 1
+
+        # pointer created once and reused, as for the receive buffers
+        func = BUFFER_PROTOTYPE(callback)
+        data = bytearray(3)
+        pointer = writable_buffer(data, POINTER(c_ubyte))
+        func(pointer, len(data))
+        self.assertEqual(data, b'\xb0\xb1\xb2')
+        data[:] = bytes(3)
+        func(pointer, len(data))
+        self.assertEqual(data, b'\xb0\xb1\xb2')
+
+    @unittest.skipUnless(IS_WINDOWS, 'Windows only test')
+    def test_winusb_prototypes(self):
+        from usbx._windows import winusb
+
+        prototypes = {name: (restype, argtypes) for name, restype, argtypes in winusb._PROTOTYPES}
+        write_data = []
+
+        def write_pipe(_handle, _pipe_id, buffer, length, transferred, _overlapped):
+            write_data.append(ctypes.string_at(buffer, length))
+            transferred[0] = length
+            return 1
+
+        def read_pipe(_handle, _pipe_id, buffer, length, transferred, _overlapped):
+            for i in range(length):
+                buffer[i] = 0xf0 + i
+            transferred[0] = length
+            return 1
+
+        restype, argtypes = prototypes['WinUsb_WritePipe']
+        func = ctypes.WINFUNCTYPE(restype, *argtypes)(write_pipe)
+        transferred = winusb.ULONG()
+        data = b'\x00\x7f\x80\xff'
+        self.assertEqual(func(None, 0x02, readable_buffer(data, None), len(data), transferred, None), 1)
+        self.assertEqual(write_data, [data])
+        self.assertEqual(transferred.value, len(data))
+
+        restype, argtypes = prototypes['WinUsb_ReadPipe']
+        func = ctypes.WINFUNCTYPE(restype, *argtypes)(read_pipe)
+        buffer = bytearray(3)
+        self.assertEqual(func(None, 0x82, writable_buffer(buffer, None), len(buffer), transferred, None), 1)
+        self.assertEqual(buffer, b'\xf0\xf1\xf2')
+        buffer = bytearray(3)
+        self.assertEqual(func(None, 0x82, writable_buffer(buffer, winusb.PUCHAR), len(buffer), transferred, None), 1)
+        self.assertEqual(buffer, b'\xf0\xf1\xf2')
@@ -8,14 +8,15 @@ sys.path.append(".")
 
 import time
 from random import Random
-from threading import Thread, current_thread
+from threading import Thread, current_thread, local
 from typing import Callable
 
 from tests.deviceconfig import get_config, TestDeviceConfig
-from usbx import usb, Device, USBError
+from usbx import usb, Device, TransferDirection, USBError
 
 
 class Work(object):
+    operation: str = ''
     start_time: float = 0
     expected_work_per_sec: int = 0
     actual_work: int = 0
@@ -41,15 +42,23 @@ class DeviceWorker(object):
     def __init__(self, device: Device, config: TestDeviceConfig):
         self.device: Device = device
         self.config: TestDeviceConfig = config
-        self.work_tracking: dict[Thread, Work] = {}
+        self.threads: list[Thread] = []
+        self.work: list[Work] = []
+        self.thread_work = local()
         self.seed: int = int(time.time())
         self.disconnect_time: float = 0
+        self.loopback_chunk_size: int = 5000
 
     def start(self) -> None:
         print('Device connected')
         self.device.open()
         self.device.claim_interface(self.config.interface_number)
 
+        # send multiples of the packet size (at least 512 bytes for full-speed devices)
+        endpoint = self.device.get_endpoint(self.config.endpoint_loopback_out, TransferDirection.OUT)
+        if endpoint is not None:
+            self.loopback_chunk_size = max(8 * endpoint.max_packet_size, 512)
+
         # start loopback sender and receiver
         self.start_thread(self.send_loopback_data)
         self.start_thread(self.receive_loopback_data)
@@ -63,7 +72,7 @@ class DeviceWorker(object):
         prng = PRNG(self.seed)
 
         while True:
-            data = prng.get_bytes(5000)
+            data = prng.get_bytes(self.loopback_chunk_size)
             self.device.transfer_out(self.config.endpoint_loopback_out, data, 0.2)
             self.log_work(len(data))
 
@@ -91,12 +100,14 @@ class DeviceWorker(object):
             self.log_work(1)
 
     def start_thread(self, action: Callable[[], None]) -> None:
-        thread = Thread(target=self.run_action, args=(action,))
         work = Work()
-        self.work_tracking[thread] = work
+        thread = Thread(target=self.run_action, args=(action, work))
+        self.threads.append(thread)
+        self.work.append(work)
         thread.start()
 
-    def run_action(self, action: Callable[[], None]) -> None:
+    def run_action(self, action: Callable[[], None], work: Work) -> None:
+        self.thread_work.work = work
         try:
             action()
         except USBError:
@@ -104,23 +115,22 @@ class DeviceWorker(object):
 
     def log_start(self, operation: str, expected_work_per_sec: int) -> None:
         current_thread().name = operation
-        work = self.work_tracking[current_thread()]
+        work = self.thread_work.work
+        work.operation = operation
         work.start_time = time.time()
         work.expected_work_per_sec = expected_work_per_sec
 
     def log_work(self, amount: int) -> None:
-        work = self.work_tracking[current_thread()]
-        work.actual_work += amount
+        self.thread_work.work.actual_work += amount
 
     def log_finish(self) -> None:
-        work = self.work_tracking[current_thread()]
-        work.finish_time = time.time()
+        self.thread_work.work.finish_time = time.time()
 
     def set_disconnect_time(self) -> None:
         self.disconnect_time = time.time()
 
     def join(self) -> None:
-        for thread in self.work_tracking.keys():
+        for thread in self.threads:
             thread.join(5)
             if thread.is_alive():
                 print(f'Thread {thread.name} failed to join within 5s')
@@ -128,16 +138,16 @@ class DeviceWorker(object):
         self.device.close()
 
         # check achieved work
-        for thread, work in self.work_tracking.items():
+        for work in self.work:
             expected_work = work.expected_work_per_sec * (work.finish_time - work.start_time)
             if work.actual_work < expected_work:
-                print(f'Thread {thread.name} achieved insufficient work. Expected: {expected_work:.0f}, achieved:{work.actual_work:.0f}')
+                print(f'Thread {work.operation} achieved insufficient work. Expected: {expected_work:.0f}, achieved:{work.actual_work:.0f}')
 
         # check that the threads haven't finished early
-        for thread, work in self.work_tracking.items():
+        for work in self.work:
             duration = abs(work.finish_time - self.disconnect_time)
             if duration > 0.5:
-                print(f'Thread {thread.name} quit early and has likely crashed')
+                print(f'Thread {work.operation} quit early and has likely crashed')
 
         print('Device disconnected')
 
@@ -164,11 +174,12 @@ def on_disconnected_device(device: Device) -> None:
     worker.set_disconnect_time()
     worker.join()
 
-    # check that device can no longer be opened
-    Thread(target=check_disconnected, args=(device,)).start()
+    # check that device can no longer be opened;
+    # the registry marks the device as disconnected before calling this callback
+    check_disconnected(device)
+
 
 def check_disconnected(device: Device) -> None:
-    time.sleep(2)
     try:
         device.open()
         print('Error: device should not be openable after disconnect')